@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Complejo de Rips compartido entre grupos celulares de una misma lámina.
+
+El complejo de Rips de cualquier subconjunto de células es el subcomplejo
+inducido del complejo de todas ellas: una arista (i, j) con ‖pᵢ − pⱼ‖ ≤ radio
+aparece en el subconjunto si y sólo si ambos extremos pertenecen a él.  Por
+eso la búsqueda de vecinos (KD-tree) y la enumeración de aristas se hacen una
+sola vez por lámina; cada grupo o combinación se obtiene filtrando esas
+aristas con una máscara de vértices y expandiendo el complejo de banderas
+hasta dimensión 2, que es exactamente lo que hace ``gudhi.RipsComplex``.
+La persistencia se sigue calculando por subconjunto.
+"""
+
+from typing import Tuple
+
+import numpy as np
+import gudhi as gd
+from scipy.spatial import cKDTree
+
+
+def aristas_union(puntos: np.ndarray, radio: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Aristas (pares de índices) de longitud ≤ radio y sus longitudes."""
+    pares = cKDTree(puntos).query_pairs(radio, output_type="ndarray")
+    longitudes = np.linalg.norm(puntos[pares[:, 0]] - puntos[pares[:, 1]],
+                                axis=1)
+    return pares, longitudes
+
+
+def simplex_tree_inducido(pares: np.ndarray, longitudes: np.ndarray,
+                          mascara: np.ndarray,
+                          max_dimension: int = 2):
+    """
+    Simplex tree del subcomplejo inducido por ``mascara``.
+
+    Los vértices se renumeran en el orden de ``np.flatnonzero(mascara)``, el
+    mismo que tendrían los puntos ``puntos[mascara]`` en ``RipsComplex``.
+    Devuelve ``(simplex_tree, aristas)``; las aristas renumeradas sirven
+    para dibujar el complejo sin recorrer el 1-esqueleto.
+    """
+    indices = np.flatnonzero(mascara)
+    nuevo = np.full(len(mascara), -1, dtype=np.int64)
+    nuevo[indices] = np.arange(len(indices))
+
+    dentro = mascara[pares[:, 0]] & mascara[pares[:, 1]]
+    aristas = nuevo[pares[dentro]]
+
+    simplex_tree = gd.SimplexTree()
+    simplex_tree.insert_batch(np.arange(len(indices)).reshape(1, -1),
+                              np.zeros(len(indices)))
+    if len(aristas):
+        simplex_tree.insert_batch(aristas.T, longitudes[dentro])
+    simplex_tree.expansion(max_dimension)
+    return simplex_tree, aristas
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Motor cúbico: persistencia de una imagen de densidad celular.
+
+Para tejido muy denso el complejo de Rips crece con el número de células y
+sus aristas.  Aquí los centroides se rasterizan en un histograma 2D de lado
+``pixel``, se suavizan con un kernel gaussiano de desviación ``ancho_banda``
+(estimación de densidad) y se calcula la persistencia cúbica de la imagen con
+``gudhi.CubicalComplex``.  El coste depende del número de píxeles, no de
+células, así que el tiempo es predecible para láminas completas.
+
+Filtraciones
+------------
+    supernivel  (default) regiones densas nacen primero; se calcula como
+                subnivel de −densidad, así que birth ≤ death y los valores
+                son densidades con signo negativo.
+    subnivel    huecos de baja densidad nacen primero.
+
+La densidad está en células por unidad² de las coordenadas.  La salida es la
+misma tabla 'dimension', 'birth', 'death' que el motor de Rips, de modo que
+distancias.py y el resto del flujo la leen sin cambios.
+
+Salidas (por lámina <nombre>.csv)
+---------------------------------
+    <nombre>_densidad.png
+    <nombre>_diagrama_persistencia.png
+    <nombre>.csv                (tabla birth–death)
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import gudhi as gd
+from scipy.ndimage import gaussian_filter
+from tqdm import tqdm
+
+from figuras import ColaFiguras, array_persistencia, figura_diagrama
+
+
+MOTORES = ("rips", "cubico")
+FILTRACIONES = ("supernivel", "subnivel")
+
+
+# --------------------------------------------------------------------------- #
+#  RASTERIZADO Y PERSISTENCIA
+# --------------------------------------------------------------------------- #
+def limites_raster(puntos: np.ndarray, ancho_banda: float):
+    """Caja (x0, x1, y0, y1) de los puntos con un margen de 3 anchos de banda."""
+    margen = 3 * ancho_banda
+    x0, y0 = puntos.min(axis=0) - margen
+    x1, y1 = puntos.max(axis=0) + margen
+    return x0, x1, y0, y1
+
+
+def rasterizar(puntos: np.ndarray, pixel: float, ancho_banda: float,
+               limites=None):
+    """
+    Imagen de densidad (filas = y, columnas = x) y su extensión.
+
+    ``limites`` permite usar la misma rejilla para varios subconjuntos de
+    una lámina (p. ej. grupos celulares); por defecto se ajusta a los puntos.
+    """
+    if limites is None:
+        limites = limites_raster(puntos, ancho_banda)
+    x0, x1, y0, y1 = limites
+    nx = max(int(np.ceil((x1 - x0) / pixel)), 1)
+    ny = max(int(np.ceil((y1 - y0) / pixel)), 1)
+    extension = (x0, x0 + nx * pixel, y0, y0 + ny * pixel)
+
+    conteo, _, _ = np.histogram2d(puntos[:, 1], puntos[:, 0], bins=(ny, nx),
+                                  range=[extension[2:], extension[:2]])
+    densidad = gaussian_filter(conteo, sigma=ancho_banda / pixel,
+                               mode="constant") / pixel ** 2
+    return densidad, extension
+
+
+def diagrama_cubico(puntos: np.ndarray, pixel: float, ancho_banda: float,
+                    filtracion: str = "supernivel", limites=None):
+    """
+    Persistencia cúbica de la densidad de ``puntos``.
+
+    Devuelve ``(densidad, extension, diag)`` con ``diag`` en el formato de
+    ``SimplexTree.persistence()``: lista de (dim, (birth, death)).
+    """
+    densidad, extension = rasterizar(puntos, pixel, ancho_banda, limites)
+    valores = -densidad if filtracion == "supernivel" else densidad
+    complejo = gd.CubicalComplex(top_dimensional_cells=valores)
+    return densidad, extension, complejo.persistence()
+
+
+def figura_densidad(densidad: np.ndarray, extension, titulo: str,
+                    ruta_png: str):
+    """Imagen de densidad."""
+    # Importación diferida, como en figuras.py
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 10))
+    plt.imshow(densidad, origin="lower", extent=extension, cmap="viridis",
+               aspect="equal")
+    plt.colorbar(label="Densidad (células / unidad²)")
+    plt.title(f"Densidad · {titulo}")
+    plt.xlabel("X"); plt.ylabel("Y"); plt.tight_layout()
+    plt.savefig(ruta_png)
+    plt.close()
+
+
+def trabajos_figuras_cubico(densidad: np.ndarray, extension, diag,
+                            titulo: str, ruta_base: str) -> list:
+    """Imagen de densidad y diagrama como trabajos para ColaFiguras."""
+    return [
+        (figura_densidad,
+         (densidad, extension, titulo, f"{ruta_base}_densidad.png")),
+        (figura_diagrama,
+         (array_persistencia(diag), f"Persistencia cúbica · {titulo}",
+          f"{ruta_base}_diagrama_persistencia.png")),
+    ]
+
+
+# --------------------------------------------------------------------------- #
+#  PROCESAMIENTO DE LÁMINAS
+# --------------------------------------------------------------------------- #
+def procesar_csv_cubico(nombre_csv: str, ruta_in: str, ruta_out: str,
+                        pixel: float, ancho_banda: float,
+                        filtracion: str = "supernivel"):
+    """Lee un CSV de centroides, guarda su diagrama cúbico y devuelve las
+    figuras como trabajos para la cola de dibujo."""
+    df = pd.read_csv(os.path.join(ruta_in, nombre_csv))
+    puntos = df[["X_centroid", "Y_centroid"]].to_numpy()
+
+    densidad, extension, diag = diagrama_cubico(puntos, pixel, ancho_banda,
+                                                filtracion)
+
+    ruta_base = os.path.join(ruta_out, os.path.splitext(nombre_csv)[0])
+    pd.DataFrame(
+        [[dim, b, d] for dim, (b, d) in diag],
+        columns=["dimension", "birth", "death"]
+    ).to_csv(f"{ruta_base}.csv", index=False)
+    return nombre_csv, trabajos_figuras_cubico(
+        densidad, extension, diag,
+        f"{filtracion} (pixel={pixel}) · {nombre_csv}", ruta_base)
+
+
+def calcular_cubico(ruta_centroides: str, pixel: float, ancho_banda: float,
+                    filtracion: str, n_workers: int,
+                    render_workers: int = 1) -> str:
+    """Diagramas cúbicos de todas las láminas de una carpeta."""
+    ruta_cubico = os.path.join(
+        ruta_centroides, "resultados",
+        f"cubico_{filtracion}_{pixel}_{ancho_banda}")
+    os.makedirs(ruta_cubico, exist_ok=True)
+
+    archivos_csv = sorted(
+        f for f in os.listdir(ruta_centroides)
+        if f.lower().endswith(".csv")
+    )
+    if not archivos_csv:
+        print("  No se encontraron CSV en la ruta indicada.")
+        return ruta_cubico
+
+    inicio = time.time()
+    tarea = partial(procesar_csv_cubico, ruta_in=ruta_centroides,
+                    ruta_out=ruta_cubico, pixel=pixel,
+                    ancho_banda=ancho_banda, filtracion=filtracion)
+    with ColaFiguras(render_workers) as figuras, \
+            ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(tarea, csv) for csv in archivos_csv]
+        for fut in tqdm(as_completed(futures), total=len(futures),
+                        desc=f"Procesando ({n_workers} núcleos)"):
+            figuras.enviar(fut.result()[1])
+
+    print(f"\n Resultados guardados en: {ruta_cubico}")
+    print(f"  Tiempo total: {time.time() - inicio:.2f} s")
+    return ruta_cubico
@@ -8,24 +8,35 @@ de persistencia almacenados como CSV (col. 'dimension', 'birth', 'death').
 Uso
 ----
 $ python calcular_distancias.py /ruta/a/rips_1000 [--workers 4]
+                                [--tau 5] [--top-k 200] [--formato binario]
 
 - /ruta/a/rips_1000  : carpeta con muchos <nombre>.csv (diagramas)
 - --workers N        : núcleos a usar (default=4)
+- --tau τ            : poda puntos con persistencia < τ al cargar (ver poda.py)
+- --top-k K          : conserva sólo los K puntos más persistentes por diagrama
+- --formato          : 'csv' (matriz cuadrada, default) o 'binario' (triángulo
+                       condensado float32 + etiquetas, ver matriz_condensada.py)
+
+Con poda, los tamaños y cotas de error por diagrama se guardan junto a la
+carpeta de salida en poda_distancias_wasserstein.csv.
 """
 
 import os
 import sys
 import time
 import argparse
-from itertools import combinations_with_replacement
+from itertools import combinations
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import numpy as np
 import pandas as pd
 import gudhi as gd
 import gudhi.wasserstein as gw
 from tqdm import tqdm
 
+from poda import COLUMNAS_PODA, podar_diagrama, resumen_poda
+from matriz_condensada import (FORMATOS, TIPOS_FORMATO, MatrizCondensada,
+                               guardar_matriz)
+
 
 # --------------------------------------------------------------------------- #
 #  FUNCIÓN QUE CARGA UN CSV Y DEVUELVE DOS ARRAYS (dim 0 y dim 1)
@@ -62,7 +73,9 @@ def _distancia_par(args):
 # --------------------------------------------------------------------------- #
 #  FUNCIÓN PRINCIPAL
 # --------------------------------------------------------------------------- #
-def calcular_distancias(ruta_directorio: str, workers: int = 2) -> str:
+def calcular_distancias(ruta_directorio: str, workers: int = 2,
+                        tau: float = None, top_k: int = None,
+                        formato: str = "csv") -> str:
     t0 = time.time()
 
     # Carpeta de salida
@@ -78,25 +91,41 @@ def calcular_distancias(ruta_directorio: str, workers: int = 2) -> str:
         print(" No se encontraron archivos CSV en la ruta indicada.")
         return carpeta_salida
 
-    diag0_list, diag1_list = [], []
+    podar = tau is not None or top_k is not None
+    diag0_list, diag1_list, registro_poda = [], [], []
     for nombre in archivos:
         try:
             d0, d1 = _cargar_csv(os.path.join(ruta_directorio, nombre))
-            diag0_list.append(d0)
-            diag1_list.append(d1)
         except Exception as e:
             print(f" {nombre}: {e}")
             return carpeta_salida
+        # Poda una sola vez por diagrama, no por par
+        if podar:
+            d0, info0 = podar_diagrama(d0, tau, top_k)
+            d1, info1 = podar_diagrama(d1, tau, top_k)
+            registro_poda.append({"archivo": nombre, "dimension": 0, **info0})
+            registro_poda.append({"archivo": nombre, "dimension": 1, **info1})
+        diag0_list.append(d0)
+        diag1_list.append(d1)
+
+    if podar:
+        registro_poda = pd.DataFrame(registro_poda, columns=COLUMNAS_PODA)
+        registro_poda.to_csv(os.path.join(
+            os.path.dirname(carpeta_salida),
+            f"poda_{os.path.basename(carpeta_salida)}.csv"), index=False)
+        resumen_poda(registro_poda)
 
     n = len(archivos)
-    dist_wass0 = np.zeros((n, n))
-    dist_wass1 = np.zeros((n, n))
-    # dist_bott0 = np.zeros((n, n))   
-    # dist_bott1 = np.zeros((n, n))
+    # Sólo el triángulo superior (float32 en binario); la diagonal es nula
+    dtype = TIPOS_FORMATO[formato]
+    dist_wass0 = MatrizCondensada(archivos, dtype=dtype)
+    dist_wass1 = MatrizCondensada(archivos, dtype=dtype)
+    # dist_bott0 = MatrizCondensada(archivos, dtype=dtype)
+    # dist_bott1 = MatrizCondensada(archivos, dtype=dtype)
 
     # ------------------- Preparar tareas para paralelo ----------------------
     tareas = []
-    for (i, j) in combinations_with_replacement(range(n), 2):
+    for (i, j) in combinations(range(n), 2):
         tareas.append((i, j,
                        archivos[i], archivos[j],
                        diag0_list[i], diag1_list[i],
@@ -109,26 +138,22 @@ def calcular_distancias(ruta_directorio: str, workers: int = 2) -> str:
         for fut in tqdm(as_completed(futures), total=len(futures),
                         desc=f"Calculando distancias ({workers} núcleos)"):
             i, j, w0, w1 = fut.result()               # , b0, b1
-            dist_wass0[i, j] = dist_wass0[j, i] = w0
-            dist_wass1[i, j] = dist_wass1[j, i] = w1
-            # dist_bott0[i, j] = dist_bott0[j, i] = b0
-            # dist_bott1[i, j] = dist_bott1[j, i] = b1
+            dist_wass0[i, j] = w0
+            dist_wass1[i, j] = w1
+            # dist_bott0[i, j] = b0
+            # dist_bott1[i, j] = b1
 
     # ------------------- Guardar resultados ---------------------------------
-    pd.DataFrame(dist_wass0, index=archivos,
-                 columns=archivos).to_csv(
-        os.path.join(carpeta_salida, "wasserstein_dim0.csv"))
-    pd.DataFrame(dist_wass1, index=archivos,
-                 columns=archivos).to_csv(
-        os.path.join(carpeta_salida, "wasserstein_dim1.csv"))
+    guardar_matriz(dist_wass0, os.path.join(carpeta_salida, "wasserstein_dim0"),
+                   formato)
+    guardar_matriz(dist_wass1, os.path.join(carpeta_salida, "wasserstein_dim1"),
+                   formato)
 
     # Si activas Bottleneck, descomenta estas líneas
-    # pd.DataFrame(dist_bott0, index=archivos,
-    #              columns=archivos).to_csv(
-    #     os.path.join(carpeta_salida, "bottleneck_dim0.csv"))
-    # pd.DataFrame(dist_bott1, index=archivos,
-    #              columns=archivos).to_csv(
-    #     os.path.join(carpeta_salida, "bottleneck_dim1.csv"))
+    # guardar_matriz(dist_bott0, os.path.join(carpeta_salida, "bottleneck_dim0"),
+    #                formato)
+    # guardar_matriz(dist_bott1, os.path.join(carpeta_salida, "bottleneck_dim1"),
+    #                formato)
 
     print(f"\n Distancias guardadas en: {carpeta_salida}")
     print(f"  Tiempo total: {time.time() - t0:.2f} s")
@@ -144,6 +169,12 @@ def parse_args():
     p.add_argument("ruta", help="Carpeta con diagramas (CSV).")
     p.add_argument("--workers", type=int, default=4,
                    help="Núcleos a usar (default=4).")
+    p.add_argument("--tau", type=float, default=None,
+                   help="Podar puntos con persistencia < tau (default=sin poda).")
+    p.add_argument("--top-k", type=int, default=None,
+                   help="Conservar los K puntos más persistentes (default=todos).")
+    p.add_argument("--formato", choices=FORMATOS, default="csv",
+                   help="Formato de las matrices: csv o binario (default=csv).")
     return p.parse_args()
 
 
@@ -154,4 +185,6 @@ if __name__ == "__main__":
         print(f" La ruta '{args.ruta}' no existe o no es un directorio.")
         sys.exit(1)
 
-    calcular_distancias(args.ruta, workers=args.workers)
+    calcular_distancias(args.ruta, workers=args.workers,
+                        tau=args.tau, top_k=args.top_k,
+                        formato=args.formato)
@@ -10,7 +10,9 @@ Ejecución
 ---------
 $ python distancias_por_grupo.py /ruta/a/diagramas   \
                                  [--workers 4]       \
-                                 [--bottleneck]
+                                 [--bottleneck]      \
+                                 [--tau 5] [--top-k 200]   \
+                                 [--formato binario]
 
 Argumentos
 ----------
@@ -18,6 +20,10 @@ Argumentos
                     por rips_grupos.py (nombre termina en _<grupo>.csv).
 --workers N       : núcleos que se usarán (int, default = 4).
 --bottleneck      : si se indica, también se calculan distancias Bottleneck.
+--tau τ           : poda puntos con persistencia < τ al cargar (ver poda.py).
+--top-k K         : conserva sólo los K puntos más persistentes por diagrama.
+--formato         : 'csv' (default) o 'binario' (triángulo condensado float32
+                    + etiquetas, ver matriz_condensada.py).
 
 Salidas
 -------
@@ -32,6 +38,9 @@ Para cada grupo ('tumorales', 'linfoides', 'mieloides', 'no_tumorales'):
 Todos los ficheros se guardan en:
     <ruta_diagramas>/resultados/distancias_grupos/
 
+Con poda, los tamaños y cotas de error por diagrama se guardan junto a esa
+carpeta en poda_distancias_grupos.csv (columna 'grupo').
+
 Compatibilidad
 --------------
 Probado en Python ≥3.7.  Para Python <3.9 se usan anotaciones de typing del
@@ -43,7 +52,7 @@ import re
 import sys
 import time
 import argparse
-from itertools import combinations_with_replacement
+from itertools import combinations
 from typing import List, Tuple, Dict
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
@@ -53,6 +62,10 @@ import gudhi as gd
 import gudhi.wasserstein as gw
 from tqdm import tqdm
 
+from poda import COLUMNAS_PODA, podar_diagrama, resumen_poda
+from matriz_condensada import (FORMATOS, TIPOS_FORMATO, MatrizCondensada,
+                               guardar_matriz)
+
 # --------------------------------------------------------------------------- #
 #  CONSTANTES
 # --------------------------------------------------------------------------- #
@@ -99,15 +112,18 @@ def procesar_grupo(diags0: Dict[str, np.ndarray],
                    diags1: Dict[str, np.ndarray],
                    carpeta_out: str,
                    workers: int,
-                   calc_bottleneck: bool):
+                   calc_bottleneck: bool,
+                   formato: str = "csv"):
     archivos = list(diags0.keys())
     n = len(archivos)
 
-    # Inicializar matrices
-    m_w0 = np.zeros((n, n))
-    m_w1 = np.zeros((n, n))
-    m_b0 = np.zeros((n, n))
-    m_b1 = np.zeros((n, n))
+    # Inicializar matrices (triángulo superior, float32 en binario, diagonal nula)
+    dtype = TIPOS_FORMATO[formato]
+    m_w0 = MatrizCondensada(archivos, dtype=dtype)
+    m_w1 = MatrizCondensada(archivos, dtype=dtype)
+    if calc_bottleneck:
+        m_b0 = MatrizCondensada(archivos, dtype=dtype)
+        m_b1 = MatrizCondensada(archivos, dtype=dtype)
 
     # Crear lista de tareas
     tareas = [
@@ -115,30 +131,30 @@ def procesar_grupo(diags0: Dict[str, np.ndarray],
          diags0[archivos[i]], diags1[archivos[i]],
          diags0[archivos[j]], diags1[archivos[j]],
          calc_bottleneck)
-        for i, j in combinations_with_replacement(range(n), 2)
+        for i, j in combinations(range(n), 2)
     ]
 
     with ProcessPoolExecutor(max_workers=workers) as pool:
         for res in tqdm(pool.map(distancia_par, tareas),
                         total=len(tareas), desc="  pares"):
             i, j, w0, w1, b0, b1 = res
-            m_w0[i, j] = m_w0[j, i] = w0
-            m_w1[i, j] = m_w1[j, i] = w1
+            m_w0[i, j] = w0
+            m_w1[i, j] = w1
             if calc_bottleneck:
-                m_b0[i, j] = m_b0[j, i] = b0
-                m_b1[i, j] = m_b1[j, i] = b1
+                m_b0[i, j] = b0
+                m_b1[i, j] = b1
 
     # Guardar matrices
-    pd.DataFrame(m_w0, index=archivos, columns=archivos).to_csv(
-        os.path.join(carpeta_out, "distancias_wasserstein_dim0.csv"))
-    pd.DataFrame(m_w1, index=archivos, columns=archivos).to_csv(
-        os.path.join(carpeta_out, "distancias_wasserstein_dim1.csv"))
+    guardar_matriz(m_w0, os.path.join(carpeta_out, "distancias_wasserstein_dim0"),
+                   formato)
+    guardar_matriz(m_w1, os.path.join(carpeta_out, "distancias_wasserstein_dim1"),
+                   formato)
 
     if calc_bottleneck:
-        pd.DataFrame(m_b0, index=archivos, columns=archivos).to_csv(
-            os.path.join(carpeta_out, "distancias_bottleneck_dim0.csv"))
-        pd.DataFrame(m_b1, index=archivos, columns=archivos).to_csv(
-            os.path.join(carpeta_out, "distancias_bottleneck_dim1.csv"))
+        guardar_matriz(m_b0, os.path.join(carpeta_out, "distancias_bottleneck_dim0"),
+                       formato)
+        guardar_matriz(m_b1, os.path.join(carpeta_out, "distancias_bottleneck_dim1"),
+                       formato)
 
 
 # --------------------------------------------------------------------------- #
@@ -146,7 +162,10 @@ def procesar_grupo(diags0: Dict[str, np.ndarray],
 # --------------------------------------------------------------------------- #
 def distancias_por_grupo(ruta_dir: str,
                          workers: int = 2,
-                         calc_bottleneck: bool = False):
+                         calc_bottleneck: bool = False,
+                         tau: float = None,
+                         top_k: int = None,
+                         formato: str = "csv"):
     t0 = time.time()
 
     ruta_dir     = os.path.abspath(ruta_dir)              
@@ -158,6 +177,9 @@ def distancias_por_grupo(ruta_dir: str,
     datos0 = {g: {} for g in GRUPOS_PERMITIDOS}
     datos1 = {g: {} for g in GRUPOS_PERMITIDOS}
 
+    podar = tau is not None or top_k is not None
+    registro_poda = []
+
     # Recorrer CSV
     for f in os.listdir(ruta_dir):
         if not f.lower().endswith(".csv"):
@@ -166,9 +188,27 @@ def distancias_por_grupo(ruta_dir: str,
         if grupo not in GRUPOS_PERMITIDOS:
             continue
         diag0, diag1 = cargar_diagramas(os.path.join(ruta_dir, f))
+        # Poda una sola vez por diagrama, no por par
+        if podar:
+            diag0, info0 = podar_diagrama(diag0, tau, top_k)
+            diag1, info1 = podar_diagrama(diag1, tau, top_k)
+            registro_poda.append({"grupo": grupo, "archivo": f,
+                                  "dimension": 0, **info0})
+            registro_poda.append({"grupo": grupo, "archivo": f,
+                                  "dimension": 1, **info1})
         datos0[grupo][f] = diag0
         datos1[grupo][f] = diag1
 
+    if podar and registro_poda:
+        registro_poda = pd.DataFrame(registro_poda,
+                                     columns=["grupo"] + COLUMNAS_PODA)
+        registro_poda.to_csv(os.path.join(parent_dir,
+                                          "poda_distancias_grupos.csv"),
+                             index=False)
+        for grupo, sub in registro_poda.groupby("grupo"):
+            print(f" Poda grupo '{grupo}':")
+            resumen_poda(sub)
+
     # Procesar cada grupo
     for grupo in GRUPOS_PERMITIDOS:
         if not datos0[grupo]:
@@ -179,7 +219,7 @@ def distancias_por_grupo(ruta_dir: str,
         carpeta_grupo = os.path.join(carpeta_out_base, grupo)
         os.makedirs(carpeta_grupo, exist_ok=True)
         procesar_grupo(datos0[grupo], datos1[grupo],
-                       carpeta_grupo, workers, calc_bottleneck)
+                       carpeta_grupo, workers, calc_bottleneck, formato)
 
     print(f"\n Resultados guardados en: {carpeta_out_base}")
     print(f"  Tiempo total: {time.time() - t0:.2f} s")
@@ -197,6 +237,12 @@ def get_args():
                    help="Núcleos a usar (default=4)")
     p.add_argument("--bottleneck", action="store_true",
                    help="Incluir distancias Bottleneck")
+    p.add_argument("--tau", type=float, default=None,
+                   help="Podar puntos con persistencia < tau (default=sin poda)")
+    p.add_argument("--top-k", type=int, default=None,
+                   help="Conservar los K puntos más persistentes (default=todos)")
+    p.add_argument("--formato", choices=FORMATOS, default="csv",
+                   help="Formato de las matrices: csv o binario (default=csv)")
     return p.parse_args()
 
 
@@ -212,4 +258,7 @@ if __name__ == "__main__":
 
     distancias_por_grupo(args.ruta,
                          workers=args.workers,
-                         calc_bottleneck=args.bottleneck)
+                         calc_bottleneck=args.bottleneck,
+                         tau=args.tau,
+                         top_k=args.top_k,
+                         formato=args.formato)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PERMANOVA, ANOSIM y estabilidad bootstrap de los clusters jerárquicos sobre
+las matrices de distancia (los mismos datos que los clustermaps).
+
+PERMANOVA
+    Con la matriz de Gower G = −½ H D² H (precalculada una vez por matriz),
+    la suma de cuadrados entre grupos es Σ_g 1_gᵀ G 1_g / n_g y la total es
+    tr(G); pseudo-F = (SS_B/(g−1)) / (SS_W/(n−g)).
+ANOSIM
+    Con la matriz de rangos de las distancias, R = (r̄_B − r̄_W) / (M/2),
+    M = n(n−1)/2.  La suma de rangos dentro de grupos es Σ_g 1_gᵀ Rk 1_g / 2.
+
+En ambos casos lo único que cambia al permutar las etiquetas son las sumas
+1_gᵀ A 1_g: un lote de B permutaciones se codifica como indicadoras (B·g)×n y
+se resuelve con un producto de matrices.  Los lotes se reparten entre
+procesos; el p-valor es (1 + #{est_perm ≥ est_obs}) / (1 + permutaciones).
+
+Estabilidad
+    Se agrupa la matriz completa (linkage sobre el vector condensado, cortado
+    en k clusters) y se repite sobre submuestras sin reemplazo (--fraccion).
+    Por cada k se informa el ARI medio con la partición de referencia y, por
+    cluster, el Jaccard medio de su mejor coincidencia (Hennig, 2007).
+
+Las semillas salen de ``SeedSequence([semilla, prueba]).spawn``: el resultado
+no depende de --workers ni de qué otras matrices se analicen.
+
+Ejecución
+---------
+$ python estadisticos.py /ruta/a/distancias_grupos [--factores tipo fanconi]
+                         [--permutaciones 10000] [--bootstrap 200]
+                         [--k 2 3] [--metodo average] [--workers 4]
+
+Argumentos
+----------
+/ruta/...        : carpeta con matrices (CSV o binario); se recorren también
+                   sus subcarpetas (grupos / combinaciones).
+--factores       : 'tipo' (get_sample_type) y/o 'fanconi' (get_fanconi_status).
+--permutaciones  : permutaciones por prueba (default=10000).
+--bootstrap      : submuestras para la estabilidad (default=200, 0 = omitir).
+--fraccion       : fracción de muestras por submuestra (default=0.8).
+--k              : número(s) de clusters a evaluar (default=2).
+--metodo         : método de linkage, como en clustermap (default=average).
+--lote           : permutaciones / submuestras por tarea (default=500).
+
+Resultados, junto a la carpeta (no dentro):
+    estadisticos_<carpeta>.csv   PERMANOVA y ANOSIM por matriz y factor
+    estabilidad_<carpeta>.csv    ARI y Jaccard por matriz, k y cluster
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from scipy.cluster.hierarchy import fcluster
+
+from lotes import repartir_permutaciones
+from matriz_condensada import MatrizCondensada, cargar_matriz, matrices_arbol
+from metadatos import clean_filename, get_sample_type, get_fanconi_status
+
+
+FACTORES = {
+    "tipo": get_sample_type,
+    "fanconi": get_fanconi_status,
+}
+
+COLUMNAS_PRUEBAS = [
+    "matriz", "factor", "prueba", "n", "grupos",
+    "estadistico", "p_valor", "permutaciones",
+]
+
+COLUMNAS_ESTABILIDAD = [
+    "matriz", "metodo", "k", "cluster", "n_cluster",
+    "jaccard_medio", "ari_medio", "submuestras",
+]
+
+# Claves de SeedSequence por tipo de remuestreo
+_PERMUTACIONES, _BOOTSTRAP = 0, 1
+
+# Matriz en curso, copiada una vez por worker
+_MATRIZ = {}
+
+
+# --------------------------------------------------------------------------- #
+#  MATRICES PRECALCULADAS
+# --------------------------------------------------------------------------- #
+def gram_centrada(dist: np.ndarray) -> np.ndarray:
+    """Matriz de Gower G = −½ H D² H."""
+    a = -0.5 * dist ** 2
+    return a - a.mean(axis=0) - a.mean(axis=1)[:, None] + a.mean()
+
+
+def matriz_rangos(matriz: MatrizCondensada) -> np.ndarray:
+    """Rangos (promedio en empates) de las distancias, como matriz n×n."""
+    rangos = np.zeros((matriz.n, matriz.n))
+    i, j = np.triu_indices(matriz.n, k=1)
+    rangos[i, j] = rangos[j, i] = rankdata(np.asarray(matriz.valores))
+    return rangos
+
+
+def codificar(etiquetas, factor: str):
+    """Códigos enteros del factor por muestra y nombres de los niveles."""
+    clasificar = FACTORES[factor]
+    valores = [clasificar(clean_filename(e)) for e in etiquetas]
+    niveles, codigos = np.unique(valores, return_inverse=True)
+    return codigos, list(niveles)
+
+
+# --------------------------------------------------------------------------- #
+#  ESTADÍSTICOS EN LOTES
+# --------------------------------------------------------------------------- #
+def sumas_por_grupo(codigos: np.ndarray, A: np.ndarray, g: int) -> np.ndarray:
+    """1_gᵀ A 1_g para cada fila de ``codigos`` (B×n) → array B×g."""
+    B, n = codigos.shape
+    indicadoras = (codigos[:, None, :] == np.arange(g)[None, :, None])
+    indicadoras = indicadoras.reshape(B * g, n).astype(float)
+    sumas = np.einsum("kn,kn->k", indicadoras @ A, indicadoras)
+    return sumas.reshape(B, g)
+
+
+def pseudo_f(sumas_gram: np.ndarray, tamanos: np.ndarray,
+             traza: float) -> np.ndarray:
+    """Pseudo-F de PERMANOVA para cada fila de sumas B×g."""
+    n, g = tamanos.sum(), len(tamanos)
+    ss_entre = (sumas_gram / tamanos).sum(axis=1)
+    ss_dentro = traza - ss_entre
+    return (ss_entre / (g - 1)) / (ss_dentro / (n - g))
+
+
+def r_anosim(sumas_rangos: np.ndarray, tamanos: np.ndarray) -> np.ndarray:
+    """R de ANOSIM para cada fila de sumas de rangos B×g."""
+    n = tamanos.sum()
+    m = n * (n - 1) / 2
+    pares_dentro = (tamanos * (tamanos - 1) / 2).sum()
+    dentro = sumas_rangos.sum(axis=1) / 2
+    total = m * (m + 1) / 2
+    r_dentro = dentro / pares_dentro
+    r_entre = (total - dentro) / (m - pares_dentro)
+    return (r_entre - r_dentro) / (m / 2)
+
+
+def _iniciar_worker(matriz, gram, rangos):
+    _MATRIZ.update(matriz=matriz, gram=gram, rangos=rangos)
+
+
+def _lote_permutado(codigos, g, semilla, tamano):
+    rng = np.random.default_rng(semilla)
+    permutados = rng.permuted(np.tile(codigos, (tamano, 1)), axis=1)
+    return (sumas_por_grupo(permutados, _MATRIZ["gram"], g),
+            sumas_por_grupo(permutados, _MATRIZ["rangos"], g))
+
+
+def semillas(semilla: int, prueba: int, n: int):
+    """n semillas independientes para un tipo de remuestreo."""
+    return np.random.SeedSequence([semilla, prueba]).spawn(n)
+
+
+# --------------------------------------------------------------------------- #
+#  ESTABILIDAD BOOTSTRAP
+# --------------------------------------------------------------------------- #
+def _contingencia(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    _, ia = np.unique(a, return_inverse=True)
+    _, ib = np.unique(b, return_inverse=True)
+    tabla = np.zeros((ia.max() + 1, ib.max() + 1))
+    np.add.at(tabla, (ia, ib), 1)
+    return tabla
+
+
+def indice_rand_ajustado(a: np.ndarray, b: np.ndarray) -> float:
+    """ARI de Hubert y Arabie entre dos particiones."""
+    tabla = _contingencia(a, b)
+    comb = lambda x: x * (x - 1) / 2
+    suma = comb(tabla).sum()
+    filas, cols = comb(tabla.sum(axis=1)).sum(), comb(tabla.sum(axis=0)).sum()
+    esperado = filas * cols / comb(len(a))
+    maximo = (filas + cols) / 2
+    if maximo == esperado:
+        return 1.0
+    return float((suma - esperado) / (maximo - esperado))
+
+
+def jaccard_clusters(referencia: np.ndarray, nueva: np.ndarray,
+                     clusters: np.ndarray) -> np.ndarray:
+    """Mejor Jaccard de cada cluster de referencia contra la partición nueva."""
+    jaccard = np.full(len(clusters), np.nan)
+    for c_idx, c in enumerate(clusters):
+        en_c = referencia == c
+        if not en_c.any():
+            continue
+        for d in np.unique(nueva):
+            en_d = nueva == d
+            inter = np.count_nonzero(en_c & en_d)
+            union = np.count_nonzero(en_c | en_d)
+            jaccard[c_idx] = np.fmax(jaccard[c_idx], inter / union)
+    return jaccard
+
+
+def _lote_bootstrap(referencias, metodo, fraccion, semilla, tamano):
+    rng = np.random.default_rng(semilla)
+    matriz = _MATRIZ["matriz"]
+    m = max(int(round(fraccion * matriz.n)), 2)
+    aris = {k: [] for k in referencias}
+    jaccards = {k: [] for k in referencias}
+    for _ in range(tamano):
+        indices = np.sort(rng.choice(matriz.n, m, replace=False))
+        enlace = matriz.submatriz(indices).linkage(metodo)
+        for k, ref in referencias.items():
+            nueva = fcluster(enlace, k, criterion="maxclust")
+            aris[k].append(indice_rand_ajustado(ref[indices], nueva))
+            jaccards[k].append(jaccard_clusters(ref[indices], nueva,
+                                                np.unique(ref)))
+    return aris, jaccards
+
+
+# --------------------------------------------------------------------------- #
+#  ANÁLISIS DE UNA MATRIZ
+# --------------------------------------------------------------------------- #
+def _pruebas(pool, matriz, gram, rangos, nombre, args) -> list:
+    filas = []
+    tamanos_lote = repartir_permutaciones(args.permutaciones, args.lote)
+    for factor in args.factores:
+        codigos, niveles = codificar(matriz.etiquetas, factor)
+        g = len(niveles)
+        if g < 2:
+            print(f"  {factor}: un solo nivel ({niveles}), se omite.")
+            continue
+        if matriz.n <= g:
+            print(f"  {factor}: {g} niveles para {matriz.n} muestras, "
+                  f"se omite.")
+            continue
+        tamanos = np.bincount(codigos, minlength=g).astype(float)
+
+        obs_g = sumas_por_grupo(codigos[None, :], gram, g)
+        obs_r = sumas_por_grupo(codigos[None, :], rangos, g)
+        f_obs = pseudo_f(obs_g, tamanos, np.trace(gram))[0]
+        r_obs = r_anosim(obs_r, tamanos)[0]
+
+        mayores_f = mayores_r = 0
+        lotes = pool.map(_lote_permutado, [codigos] * len(tamanos_lote),
+                         [g] * len(tamanos_lote),
+                         semillas(args.semilla, _PERMUTACIONES,
+                                  len(tamanos_lote)),
+                         tamanos_lote)
+        for perm_g, perm_r in lotes:
+            f_perm = pseudo_f(perm_g, tamanos, np.trace(gram))
+            r_perm = r_anosim(perm_r, tamanos)
+            # Tolerancia relativa: la permutación identidad empata consigo misma
+            mayores_f += np.count_nonzero(f_perm >= f_obs - 1e-12 * abs(f_obs))
+            mayores_r += np.count_nonzero(r_perm >= r_obs - 1e-12 * abs(r_obs))
+
+        base = {"matriz": nombre, "factor": factor, "n": matriz.n,
+                "grupos": "/".join(niveles),
+                "permutaciones": args.permutaciones}
+        for prueba, est, mayores in (("permanova", f_obs, mayores_f),
+                                     ("anosim", r_obs, mayores_r)):
+            p = (1 + mayores) / (1 + args.permutaciones)
+            print(f"  {factor:<8} {prueba:<9}: {est:.4g} · p = {p:.4g}")
+            filas.append({**base, "prueba": prueba, "estadistico": est,
+                          "p_valor": p})
+    return filas
+
+
+def _estabilidad(pool, matriz, nombre, args) -> list:
+    enlace = matriz.linkage(args.metodo)
+    referencias = {k: fcluster(enlace, k, criterion="maxclust")
+                   for k in args.k if k < matriz.n}
+    if not referencias:
+        return []
+
+    tamanos_lote = repartir_permutaciones(args.bootstrap, args.lote)
+    aris = {k: [] for k in referencias}
+    jaccards = {k: [] for k in referencias}
+    lotes = pool.map(_lote_bootstrap, [referencias] * len(tamanos_lote),
+                     [args.metodo] * len(tamanos_lote),
+                     [args.fraccion] * len(tamanos_lote),
+                     semillas(args.semilla, _BOOTSTRAP, len(tamanos_lote)),
+                     tamanos_lote)
+    for lote_ari, lote_jac in lotes:
+        for k in referencias:
+            aris[k].extend(lote_ari[k])
+            jaccards[k].extend(lote_jac[k])
+
+    filas = []
+    for k, ref in referencias.items():
+        ari = float(np.mean(aris[k]))
+        jac = np.nanmean(np.vstack(jaccards[k]), axis=0)
+        clusters = np.unique(ref)
+        print(f"  k={k}: ARI medio {ari:.3f} · Jaccard "
+              + " ".join(f"{j:.2f}" for j in jac))
+        for c, j in zip(clusters, jac):
+            filas.append({"matriz": nombre, "metodo": args.metodo, "k": k,
+                          "cluster": int(c),
+                          "n_cluster": int(np.count_nonzero(ref == c)),
+                          "jaccard_medio": j, "ari_medio": ari,
+                          "submuestras": args.bootstrap})
+    return filas
+
+
+def analizar_matriz(matriz: MatrizCondensada, nombre: str, args):
+    """PERMANOVA/ANOSIM por factor y estabilidad de clusters de una matriz."""
+    matriz = MatrizCondensada(matriz.etiquetas,
+                              np.asarray(matriz.valores, dtype=float))
+    gram = gram_centrada(matriz.a_dataframe().to_numpy(dtype=float))
+    rangos = matriz_rangos(matriz)
+
+    with ProcessPoolExecutor(max_workers=args.workers,
+                             initializer=_iniciar_worker,
+                             initargs=(matriz, gram, rangos)) as pool:
+        pruebas = _pruebas(pool, matriz, gram, rangos, nombre, args)
+        estabilidad = (_estabilidad(pool, matriz, nombre, args)
+                       if args.bootstrap > 0 else [])
+    return pruebas, estabilidad
+
+
+# --------------------------------------------------------------------------- #
+#  FUNCIÓN PRINCIPAL
+# --------------------------------------------------------------------------- #
+def calcular_estadisticos(ruta_dir: str, args):
+    t0 = time.time()
+    ruta_dir = os.path.abspath(ruta_dir)
+
+    pruebas, estabilidad = [], []
+    for ruta in matrices_arbol(ruta_dir):
+        nombre = os.path.relpath(os.path.splitext(ruta)[0], ruta_dir)
+        try:
+            matriz = cargar_matriz(ruta)
+        except ValueError as e:
+            print(f" {nombre}: {e} Se omite.")
+            continue
+        # Con distancias inf los estadísticos salen NaN y el linkage falla
+        if not np.isfinite(matriz.valores).all():
+            print(f" {nombre}: la matriz tiene distancias no finitas. "
+                  f"Se omite.")
+            continue
+        print(f" {nombre} ({matriz.n} muestras)")
+        filas_p, filas_e = analizar_matriz(matriz, nombre, args)
+        pruebas.extend(filas_p)
+        estabilidad.extend(filas_e)
+
+    if not pruebas and not estabilidad:
+        print(f" No hay matrices de distancia en '{ruta_dir}'.")
+        sys.exit(1)
+
+    parent_dir, carpeta = os.path.split(ruta_dir)
+    ruta_pruebas = os.path.join(parent_dir, f"estadisticos_{carpeta}.csv")
+    pd.DataFrame(pruebas, columns=COLUMNAS_PRUEBAS).to_csv(ruta_pruebas,
+                                                           index=False)
+    print(f"\n Pruebas guardadas en: {ruta_pruebas}")
+    if args.bootstrap > 0:
+        ruta_estab = os.path.join(parent_dir, f"estabilidad_{carpeta}.csv")
+        pd.DataFrame(estabilidad,
+                     columns=COLUMNAS_ESTABILIDAD).to_csv(ruta_estab,
+                                                          index=False)
+        print(f" Estabilidad guardada en: {ruta_estab}")
+    print(f"  Tiempo total: {time.time() - t0:.2f} s")
+
+
+# --------------------------------------------------------------------------- #
+#  CLI
+# --------------------------------------------------------------------------- #
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="PERMANOVA, ANOSIM y estabilidad de clusters sobre "
+                    "matrices de distancia.")
+    p.add_argument("ruta", help="Carpeta con matrices de distancia")
+    p.add_argument("--factores", nargs="+", choices=sorted(FACTORES),
+                   default=["tipo", "fanconi"],
+                   help="Factores a testear (default=tipo fanconi)")
+    p.add_argument("--permutaciones", type=int, default=10000,
+                   help="Permutaciones por prueba (default=10000)")
+    p.add_argument("--bootstrap", type=int, default=200,
+                   help="Submuestras para la estabilidad (default=200, 0=omitir)")
+    p.add_argument("--fraccion", type=float, default=0.8,
+                   help="Fracción de muestras por submuestra (default=0.8)")
+    p.add_argument("--k", type=int, nargs="+", default=[2],
+                   help="Número(s) de clusters (default=2)")
+    p.add_argument("--metodo", default="average",
+                   help="Método de linkage (default=average)")
+    p.add_argument("--lote", type=int, default=500,
+                   help="Permutaciones o submuestras por tarea (default=500)")
+    p.add_argument("--workers", type=int, default=4,
+                   help="Procesos en paralelo (default=4)")
+    p.add_argument("--semilla", type=int, default=0,
+                   help="Semilla de los remuestreos (default=0)")
+    args = p.parse_args()
+
+    if not 0 < args.fraccion < 1:
+        p.error("--fraccion debe estar entre 0 y 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not os.path.isdir(args.ruta):
+        print(f" La ruta '{args.ruta}' no existe o no es un directorio.")
+        sys.exit(1)
+
+    calcular_estadisticos(args.ruta, args)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cola de figuras: el dibujo de PNG desacoplado del cálculo de homología.
+
+Los workers de cálculo ya no llaman a ``plt.savefig``: devuelven una lista de
+trabajos ``(funcion, argumentos)`` con arrays ligeros (centroides, diagrama
+como array (n, 3) de dimension, birth, death).  Las aristas del Rips exacto
+no viajan desde el worker: ``figura_rips`` las recalcula en el pool de dibujo
+a partir de los centroides y el radio; en rips_grupos.py se pasan las que ya
+tiene ``complejo_union``.  El proceso principal los envía a un pool de dibujo aparte
+(``--render-workers``) y pasa al siguiente resultado sin esperar, así el
+rendimiento de la homología no depende de lo compleja que sea cada figura.
+
+El código de dibujo es el mismo de antes, de modo que las imágenes salen
+idénticas.  Con ``--render-workers 0`` las figuras se dibujan en serie en el
+proceso principal.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import gudhi as gd
+
+
+# --------------------------------------------------------------------------- #
+#  ARRAYS LIGEROS PARA EL DIBUJO
+# --------------------------------------------------------------------------- #
+def aristas_simplex_tree(simplex_tree) -> np.ndarray:
+    """Aristas del 1-esqueleto como array int (m, 2), en el orden de gudhi.
+
+    Recorre el esqueleto en Python: sólo para complejos sin aristas propias
+    (landmarks, witness), que son pequeños.
+    """
+    aristas = [s for s, _ in simplex_tree.get_skeleton(1) if len(s) == 2]
+    return np.array(aristas, dtype=np.int64).reshape(-1, 2)
+
+
+def aristas_rips(puntos: np.ndarray, radio: float) -> np.ndarray:
+    """Aristas del Rips exacto (pares a distancia ≤ radio) como array (m, 2)."""
+    from scipy.spatial import cKDTree
+
+    return cKDTree(puntos).query_pairs(radio, output_type="ndarray")
+
+
+def orden_gudhi(aristas: np.ndarray) -> np.ndarray:
+    """Aristas (i < j) en orden lexicográfico, el de ``get_skeleton(1)``."""
+    aristas = np.sort(np.asarray(aristas, dtype=np.int64).reshape(-1, 2),
+                      axis=1)
+    return aristas[np.lexsort((aristas[:, 1], aristas[:, 0]))]
+
+
+def array_persistencia(diag) -> np.ndarray:
+    """Diagrama gudhi [(dim, (birth, death)), ...] → array (n, 3)."""
+    return np.array([[dim, b, d] for dim, (b, d) in diag],
+                    dtype=float).reshape(-1, 3)
+
+
+def lista_persistencia(diag) -> list:
+    """Array (n, 3) → formato de ``gudhi.plot_persistence_diagram``."""
+    if not isinstance(diag, np.ndarray):
+        return diag
+    return [(int(dim), (b, d)) for dim, b, d in diag.tolist()]
+
+
+# --------------------------------------------------------------------------- #
+#  FIGURAS
+# --------------------------------------------------------------------------- #
+def figura_complejo(puntos: np.ndarray, aristas: np.ndarray, titulo: str,
+                    ruta_png: str):
+    """Centroides y aristas del complejo."""
+    # Importación diferida: los workers de cálculo no cargan matplotlib
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(24, 10))
+    plt.scatter(puntos[:, 0], puntos[:, 1], color="black",
+                label="Centroides", s=5)
+    # Mismo orden de trazado que el 1-esqueleto de gudhi: imagen idéntica
+    for i, j in orden_gudhi(aristas):
+        plt.plot([puntos[i, 0], puntos[j, 0]],
+                 [puntos[i, 1], puntos[j, 1]],
+                 color="gray", linewidth=0.5)
+    plt.title(titulo)
+    plt.xlabel("X"); plt.ylabel("Y"); plt.legend(); plt.tight_layout()
+    plt.savefig(ruta_png)
+    plt.close()
+
+
+def figura_rips(puntos: np.ndarray, radio: float, titulo: str,
+                ruta_png: str):
+    """Complejo de Rips exacto; las aristas se calculan en el pool de dibujo."""
+    figura_complejo(puntos, aristas_rips(puntos, radio), titulo, ruta_png)
+
+
+def figura_diagrama(diag, titulo: str, ruta_png: str):
+    """Diagrama de persistencia (lista gudhi o array (n, 3))."""
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6, 6))
+    gd.plot_persistence_diagram(lista_persistencia(diag))
+    plt.title(titulo)
+    plt.xlabel("Birth"); plt.ylabel("Death"); plt.tight_layout()
+    plt.savefig(ruta_png)
+    plt.close()
+
+
+def renderizar(trabajos):
+    """Ejecuta una lista de trabajos (funcion, argumentos)."""
+    for funcion, argumentos in trabajos:
+        funcion(*argumentos)
+
+
+# --------------------------------------------------------------------------- #
+#  POOL DE DIBUJO
+# --------------------------------------------------------------------------- #
+class ColaFiguras:
+    """
+    Pool de procesos sólo para dibujar.
+
+    Se usa como context manager: al salir espera a que terminen todas las
+    figuras (y propaga sus errores).  Para acotar la memoria, si hay más de
+    ``max_pendientes`` tareas en vuelo ``enviar`` espera a que acabe alguna.
+    """
+
+    def __init__(self, n_workers: int, max_pendientes: int = None):
+        self.n_workers = n_workers
+        self.max_pendientes = max_pendientes or 4 * max(n_workers, 1)
+        self.pool = (ProcessPoolExecutor(max_workers=n_workers)
+                     if n_workers > 0 else None)
+        self.pendientes = set()
+
+    def enviar(self, trabajos):
+        if not trabajos:
+            return
+        if self.pool is None:
+            renderizar(trabajos)
+            return
+        while len(self.pendientes) >= self.max_pendientes:
+            hechos, self.pendientes = wait(self.pendientes,
+                                           return_when=FIRST_COMPLETED)
+            for fut in hechos:
+                fut.result()
+        self.pendientes.add(self.pool.submit(renderizar, trabajos))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            for fut in self.pendientes:
+                fut.result()
+            self.pool.shutdown()
+        return False
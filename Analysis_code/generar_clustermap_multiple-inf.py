@@ -8,6 +8,11 @@ y anotaciones por tipo de muestra y estado Fanconi.
 Ejecución
 ---------
 $ python clustermap_multiple.py /ruta/a/matrices [--metodo average]
+
+Acepta matrices CSV cuadradas y matrices binarias condensadas (.npy +
+.etiquetas.txt, ver matriz_condensada.py).  Para las binarias el enlace
+jerárquico se calcula con scipy directamente sobre el vector condensado de
+distancias; la matriz densa sólo se construye para dibujar el heatmap.
 """
 
 import os
@@ -18,55 +23,8 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 
-# === Funciones de limpieza y clasificación ===
-
-def clean_filename(filename):
-    """Limpia el nombre del archivo (quita 'filtrado_' y la extensión)."""
-    filename = os.path.splitext(filename)[0]
-    filename = filename.replace('filtrado_', '')
-    return filename
-
-
-def get_sample_type(filename):
-    """Clasifica el tipo de muestra con base en el nombre."""
-    filename = filename.lower()
-
-    if '_and_stroma' in filename or '-and-stroma' in filename:
-        return 'and-stroma'
-    elif 'stroma_ad' in filename and 'dysplasia' in filename:
-        return 'stroma-ad-dysplasia'
-    elif 'stroma_ad' in filename and 'carcinoma' in filename:
-        return 'stroma-ad-carcinoma'
-    elif 'dysplasia' in filename:
-        return 'dysplasia'
-    elif 'carcinoma' in filename:
-        return 'carcinoma'
-    else:
-        return 'other'
-
-
-def get_fanconi_status(filename):
-    """
-    Determina el estado Fanconi: basta con que el nombre contenga una 'F' (mayúscula).
-    Ejemplo:
-        Carcinoma_FAHNSCC_14_1.csv → Fanconi
-        stroma_ad_HG_dysplasia_F79P1_1.csv → Fanconi
-        carcinoma_invasive_14_1.csv → No Fanconi
-    """
-    name = os.path.splitext(os.path.basename(filename))[0]
-    return 'Fanconi' if 'F' in name else 'No Fanconi'
-
-
-# === (Comentado) Origen anatómico ===
-# def get_origin(filename):
-#     """Clasifica el origen anatómico."""
-#     if 'HNSCC' in filename:
-#         return 'Head and Neck'
-#     elif 'AGSCC' in filename:
-#         return 'Anogenital'
-#     else:
-#         return 'Otro'
-
+from matriz_condensada import EXTENSION, MatrizCondensada, matrices_carpeta
+from metadatos import clean_filename, get_sample_type, get_fanconi_status
 
 # === Función para graficar clustermap combinado ===
 
@@ -74,8 +32,13 @@ def plot_clustermap_combinado(matrix_df, title, output_dir,
                               sample_types, fanconi_status,
                               type_colors, fanconi_colors,
                               # origin_colors, origins,   # ← comentado
-                              metodo='ward'):
-    """Genera el clustermap con anotaciones de tipo y Fanconi."""
+                              metodo='ward',
+                              enlace=None):
+    """Genera el clustermap con anotaciones de tipo y Fanconi.
+
+    Si se pasa ``enlace`` (matriz de linkage de scipy) se usa para filas y
+    columnas en lugar de reagrupar la matriz.
+    """
 
     muestras = matrix_df.index.tolist()
 
@@ -94,6 +57,8 @@ def plot_clustermap_combinado(matrix_df, title, output_dir,
         row_colors=row_colors_df,
         col_colors=row_colors_df,
         method=metodo,
+        row_linkage=enlace,
+        col_linkage=enlace,
         cbar_kws={'label': 'Distancia'},
         dendrogram_ratio=(.1, .2),
         cbar_pos=(0.02, 0.8, 0.05, 0.18),
@@ -141,13 +106,20 @@ def crear_visualizaciones(ruta_directorio, metodo='ward'):
     carpeta_visualizacion = os.path.join(ruta_directorio, "visualizacion", "combinado")
     os.makedirs(carpeta_visualizacion, exist_ok=True)
 
-    archivos_csv = [f for f in os.listdir(ruta_directorio) if f.endswith('.csv')]
-
-    for archivo in archivos_csv:
-        path = os.path.join(ruta_directorio, archivo)
+    # Una matriz por nombre base: si hay X.csv y X.npy se usa el binario,
+    # así no se sobrescribe la misma imagen dos veces
+    for path in matrices_carpeta(ruta_directorio):
+        archivo = os.path.basename(path)
         nombre_base = clean_filename(os.path.splitext(archivo)[0])
 
-        distancias = pd.read_csv(path, index_col=0)
+        enlace = None
+        if archivo.endswith(EXTENSION):
+            # Binaria condensada: linkage sin densificar
+            matriz = MatrizCondensada.cargar(path)
+            enlace = matriz.linkage(metodo)
+            distancias = matriz.a_dataframe()
+        else:
+            distancias = pd.read_csv(path, index_col=0)
 
         if distancias.shape[0] != distancias.shape[1]:
             print(f"⚠️  Saltando '{archivo}': matriz no cuadrada ({distancias.shape}).")
@@ -189,7 +161,8 @@ def crear_visualizaciones(ruta_directorio, metodo='ward'):
                                   sample_types, fanconi_status,
                                   type_colors, fanconi_colors,
                                   # origin_colors, origins,  # ← comentado
-                                  metodo=metodo)
+                                  metodo=metodo,
+                                  enlace=enlace)
 
     print("✔ Visualizaciones generadas en:", carpeta_visualizacion)
 
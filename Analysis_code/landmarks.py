@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Complejos aproximados sobre un subconjunto de landmarks.
+
+Los landmarks se eligen con muestreo maxmin (farthest-point): en cada paso se
+añade el punto más lejano a los ya elegidos.  El radio de cobertura de
+Hausdorff ε = max_p min_l ‖p − l‖ cuantifica la aproximación; para el Rips
+sobre landmarks, por estabilidad de Gromov–Hausdorff,
+
+    d_B(Dgm Rips(P), Dgm Rips(L)) ≤ 2·ε
+
+Ambos complejos se truncan en max_edge_length = radio, y la estabilidad no
+vale tal cual para filtraciones truncadas: una clase que muere justo antes de
+radio en un complejo puede ser esencial (death = inf) en el otro, y entonces
+d_B = inf.  La cota sólo es válida tras recortar las muertes a radio en ambos
+diagramas, death ← min(death, radio); por eso la tabla de aproximación
+registra también ``radio_recorte``.  Los diagramas se guardan sin recortar.
+
+El complejo witness (gudhi.EuclideanStrongWitnessComplex) usa todos los
+puntos como testigos; su filtración viene en unidades al cuadrado y se
+devuelve en raíz para que sea comparable con Rips.  Para witness sólo se
+registra ε: la cota anterior no se aplica directamente.
+"""
+
+import numpy as np
+import gudhi as gd
+from scipy.spatial import cKDTree
+
+
+COMPLEJOS = ("rips", "witness")
+
+COLUMNAS_APROXIMACION = [
+    "archivo", "complejo", "n_puntos", "n_landmarks",
+    "radio_cobertura", "cota_bottleneck", "radio_recorte",
+]
+
+
+# --------------------------------------------------------------------------- #
+#  MUESTREO MAXMIN
+# --------------------------------------------------------------------------- #
+def maxmin_landmarks(puntos: np.ndarray, n_landmarks: int, semilla: int = 0):
+    """
+    Selecciona ``n_landmarks`` puntos por muestreo maxmin.
+
+    Mantiene la distancia de cada punto a su landmark más cercano y, en cada
+    paso, sólo actualiza los puntos que el KD-tree devuelve dentro del radio
+    de cobertura actual (los únicos que pueden acercarse al nuevo landmark).
+
+    Devuelve ``(indices, radio_cobertura)``.
+    """
+    n = len(puntos)
+    if n_landmarks >= n:
+        return np.arange(n), 0.0
+
+    arbol = cKDTree(puntos)
+    rng = np.random.default_rng(semilla)
+    indices = np.empty(n_landmarks, dtype=np.int64)
+    indices[0] = rng.integers(n)
+    dist = np.linalg.norm(puntos - puntos[indices[0]], axis=1)
+
+    for k in range(1, n_landmarks):
+        nuevo = int(np.argmax(dist))
+        indices[k] = nuevo
+        vecinos = np.asarray(arbol.query_ball_point(puntos[nuevo], dist[nuevo],
+                                                    return_sorted=False),
+                             dtype=np.int64)
+        d = np.linalg.norm(puntos[vecinos] - puntos[nuevo], axis=1)
+        dist[vecinos] = np.minimum(dist[vecinos], d)
+
+    return indices, float(dist.max())
+
+
+# --------------------------------------------------------------------------- #
+#  COMPLEJO + DIAGRAMA
+# --------------------------------------------------------------------------- #
+def diagrama_aproximado(puntos: np.ndarray, radio: float, n_landmarks: int,
+                        complejo: str = "rips", semilla: int = 0):
+    """
+    Construye el complejo aproximado y calcula su persistencia.
+
+    Devuelve ``(simplex_tree, vertices, diag, info)``: ``vertices`` son las
+    coordenadas de los landmarks (índices del simplex tree), ``diag`` el
+    diagrama en formato gudhi y ``info`` un dict con las columnas de
+    ``COLUMNAS_APROXIMACION`` (salvo 'archivo').  ``cota_bottleneck`` sólo
+    vale para los diagramas con las muertes recortadas a ``radio_recorte``.
+    """
+    if complejo not in COMPLEJOS:
+        raise ValueError(f"Complejo '{complejo}' no reconocido {COMPLEJOS}.")
+
+    indices, eps = maxmin_landmarks(puntos, n_landmarks, semilla)
+    vertices = puntos[indices]
+
+    if complejo == "rips":
+        simplex_tree = gd.RipsComplex(
+            points=vertices, max_edge_length=radio
+        ).create_simplex_tree(max_dimension=2)
+        diag = simplex_tree.persistence()
+        # Válida sólo con death ← min(death, radio) en ambos diagramas
+        cota = 2 * eps
+    else:
+        simplex_tree = gd.EuclideanStrongWitnessComplex(
+            landmarks=vertices, witnesses=puntos
+        ).create_simplex_tree(max_alpha_square=radio ** 2, limit_dimension=2)
+        diag = [(dim, (np.sqrt(b), np.sqrt(d)))
+                for dim, (b, d) in simplex_tree.persistence()]
+        cota = np.nan
+
+    info = {
+        "complejo": complejo,
+        "n_puntos": len(puntos),
+        "n_landmarks": len(indices),
+        "radio_cobertura": eps,
+        "cota_bottleneck": cota,
+        "radio_recorte": radio,
+    }
+    return simplex_tree, vertices, diag, info
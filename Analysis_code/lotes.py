@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reparto de permutaciones / submuestras en lotes para los pools de procesos.
+
+Compartido por topkat.py y estadisticos.py.
+"""
+
+
+def repartir_permutaciones(n_perm: int, lote: int):
+    """Tamaños de lote que suman n_perm (el último puede ser menor)."""
+    tamanos = [lote] * (n_perm // lote)
+    if n_perm % lote:
+        tamanos.append(n_perm % lote)
+    return tamanos
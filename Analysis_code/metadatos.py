@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Metadatos de las muestras deducidos del nombre de archivo.
+
+Compartido por generar_clustermap_multiple-inf.py (anotaciones) y topkat.py
+(variable respuesta del test de asociación).
+"""
+
+import os
+
+
+# === Funciones de limpieza y clasificación ===
+
+def clean_filename(filename):
+    """Limpia el nombre del archivo (quita 'filtrado_' y la extensión)."""
+    filename = os.path.splitext(filename)[0]
+    filename = filename.replace('filtrado_', '')
+    return filename
+
+
+def get_sample_type(filename):
+    """Clasifica el tipo de muestra con base en el nombre."""
+    filename = filename.lower()
+
+    if '_and_stroma' in filename or '-and-stroma' in filename:
+        return 'and-stroma'
+    elif 'stroma_ad' in filename and 'dysplasia' in filename:
+        return 'stroma-ad-dysplasia'
+    elif 'stroma_ad' in filename and 'carcinoma' in filename:
+        return 'stroma-ad-carcinoma'
+    elif 'dysplasia' in filename:
+        return 'dysplasia'
+    elif 'carcinoma' in filename:
+        return 'carcinoma'
+    else:
+        return 'other'
+
+
+def get_fanconi_status(filename):
+    """
+    Determina el estado Fanconi: basta con que el nombre contenga una 'F' (mayúscula).
+    Ejemplo:
+        Carcinoma_FAHNSCC_14_1.csv → Fanconi
+        stroma_ad_HG_dysplasia_F79P1_1.csv → Fanconi
+        carcinoma_invasive_14_1.csv → No Fanconi
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return 'Fanconi' if 'F' in name else 'No Fanconi'
+
+
+# === (Comentado) Origen anatómico ===
+# def get_origin(filename):
+#     """Clasifica el origen anatómico."""
+#     if 'HNSCC' in filename:
+#         return 'Head and Neck'
+#     elif 'AGSCC' in filename:
+#         return 'Anogenital'
+#     else:
+#         return 'Otro'
@@ -8,12 +8,30 @@ que contienen centroides en una carpeta dada.
 Ejecución
 ---------
 $ python calcular_rips.py /ruta/a/centroides [--radio 1000] [--workers 4]
+                          [--landmarks 500 [--complejo witness]]
+                          [--tesela 5000 [--solape 1000] [--h0-global]]
+                          [--motor cubico [--pixel 50] [--ancho-banda 150]]
 
 Argumentos
 ----------
 ruta/a/centroides : carpeta con CSV (debe contener 'X_centroid', 'Y_centroid').
 --radio            : max_edge_length del complejo de Rips (float, default 1000).
 --workers          : núcleos a usar (int, default = todos los disponibles).
+--render-workers   : procesos que dibujan los PNG en segundo plano, aparte de
+                     los de cálculo (default 1; 0 = en serie, ver figuras.py).
+--tesela           : lado de tesela; activa el modo teselado para láminas
+                     completas (ver teselas.py).
+--solape           : margen de cada tesela, debe ser ≥ radio (default = radio).
+--h0-global        : en modo teselado, une H0 entre teselas de forma exacta.
+--landmarks N      : calcula el complejo sobre N landmarks maxmin (aproximado);
+                     no se combina con --tesela.
+--complejo         : 'rips' (default) o 'witness' sobre los landmarks.
+--semilla          : semilla del primer landmark (default 0).
+--motor            : 'rips' (default) o 'cubico' (persistencia de la imagen
+                     de densidad, ver cubico.py).
+--pixel            : lado de píxel del raster en modo cúbico (default 50).
+--ancho-banda      : desviación del kernel gaussiano de densidad (default 150).
+--filtracion       : 'supernivel' (default) o 'subnivel' en modo cúbico.
 
 Salidas
 -------
@@ -24,6 +42,18 @@ Para cada <nombre>.csv:
 
 Todos los ficheros se guardan en:
     <ruta_centroides>/resultados/rips_<radio>/
+
+Con --landmarks se guardan en <complejo>_<radio>_landmarks_<N>/ y, junto a
+esa carpeta, <complejo>_<radio>_landmarks_<N>_aproximacion.csv con el radio
+de cobertura de Hausdorff y la cota bottleneck de cada diagrama, válida con
+las muertes recortadas a radio (ver landmarks.py).
+
+En modo teselado no se generan imágenes y las tablas por tesela se guardan en:
+    <ruta_centroides>/resultados/teselas_<radio>_<tesela>/
+
+Con --motor cubico la imagen del complejo se sustituye por la de densidad y
+los resultados van a:
+    <ruta_centroides>/resultados/cubico_<filtracion>_<pixel>_<ancho_banda>/
 """
 
 import os
@@ -36,64 +66,101 @@ from multiprocessing import cpu_count
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import gudhi as gd
 from tqdm import tqdm
 
+from teselas import calcular_teselas
+from cubico import MOTORES, FILTRACIONES, calcular_cubico
+from figuras import (ColaFiguras, aristas_simplex_tree, array_persistencia,
+                     figura_complejo, figura_diagrama, figura_rips)
+from landmarks import COMPLEJOS, COLUMNAS_APROXIMACION, diagrama_aproximado
+
+
+# --------------------------------------------------------------------------- #
+#  CÁLCULO DEL DIAGRAMA (sin dependencias de gráficos)
+# --------------------------------------------------------------------------- #
+def calcular_diagrama(puntos: np.ndarray, radio: float,
+                      landmarks: int = None, complejo: str = "rips",
+                      semilla: int = 0):
+    """
+    Complejo de Rips (exacto o sobre landmarks) y su persistencia.
+
+    Devuelve ``(simplex_tree, vertices, diag, info)``; ``vertices`` son los
+    puntos indexados por el simplex tree e ``info`` es None para el complejo
+    exacto.
+    """
+    if landmarks is None:
+        rips_complex = gd.RipsComplex(points=puntos, max_edge_length=radio)
+        simplex_tree = rips_complex.create_simplex_tree(max_dimension=2)
+        return simplex_tree, puntos, simplex_tree.persistence(), None
+    return diagrama_aproximado(puntos, radio, landmarks, complejo, semilla)
+
+
+def tabla_diagrama(diag) -> pd.DataFrame:
+    """Diagrama gudhi → tabla 'dimension', 'birth', 'death'."""
+    return pd.DataFrame(
+        [[dim, b, d] for dim, (b, d) in diag if dim <= 2],
+        columns=["dimension", "birth", "death"]
+    )
+
+
+def _trabajos_figuras(simplex_tree, puntos: np.ndarray, diag, radio: float,
+                      nombre_csv: str, ruta_out: str,
+                      aproximado: bool = False) -> list:
+    """Figuras del complejo y del diagrama como trabajos para ColaFiguras."""
+    nombre_base = os.path.splitext(nombre_csv)[0]
+    titulo = f"Complejo de Rips (r={radio}) · {nombre_csv}"
+    ruta_png = os.path.join(ruta_out, f"{nombre_base}_complejo_rips.png")
+    if aproximado:
+        complejo = (figura_complejo,
+                    (puntos, aristas_simplex_tree(simplex_tree), titulo,
+                     ruta_png))
+    else:
+        # Rips exacto: las aristas se recalculan en el pool de dibujo
+        complejo = (figura_rips, (puntos, radio, titulo, ruta_png))
+    return [
+        complejo,
+        (figura_diagrama,
+         (array_persistencia(diag),
+          f"Diagrama de Persistencia (r={radio}) · {nombre_csv}",
+          os.path.join(ruta_out, f"{nombre_base}_diagrama_persistencia.png"))),
+    ]
+
 
 # --------------------------------------------------------------------------- #
 #  FUNCIÓN QUE PROCESA UN ÚNICO CSV (se ejecuta en cada proceso)
 # --------------------------------------------------------------------------- #
-def _procesar_csv(nombre_csv: str, ruta_in: str, ruta_out: str, radio: float):
-    """Lee un CSV, calcula Rips + persistencia y guarda resultados."""
+def _procesar_csv(nombre_csv: str, ruta_in: str, ruta_out: str, radio: float,
+                  landmarks: int = None, complejo: str = "rips",
+                  semilla: int = 0):
+    """
+    Lee un CSV, calcula Rips + persistencia y guarda la tabla birth–death.
+
+    Las figuras no se dibujan aquí: se devuelven como trabajos para la cola
+    de dibujo del proceso principal.
+    """
     ruta_completa = os.path.join(ruta_in, nombre_csv)
 
     # --- Leer centroides -----------------------------------------------------
     df = pd.read_csv(ruta_completa)
-    centroides_x = df["X_centroid"].to_numpy()
-    centroides_y = df["Y_centroid"].to_numpy()
-    puntos = np.column_stack((centroides_x, centroides_y))
+    puntos = df[["X_centroid", "Y_centroid"]].to_numpy()
 
-    # --- Complejo de Rips ----------------------------------------------------
-    rips_complex = gd.RipsComplex(points=puntos, max_edge_length=radio)
-    simplex_tree = rips_complex.create_simplex_tree(max_dimension=2)
+    # --- Complejo de Rips (exacto o sobre landmarks) -------------------------
+    simplex_tree, puntos, diag, info = calcular_diagrama(
+        puntos, radio, landmarks, complejo, semilla)
+    if info is not None:
+        info = {"archivo": nombre_csv, **info}
 
+    # --- CSV con pares birth-death ------------------------------------------
     nombre_base = os.path.splitext(nombre_csv)[0]
+    tabla_diagrama(diag).to_csv(os.path.join(ruta_out, f"{nombre_base}.csv"),
+                                index=False)
 
-    # --- Imagen del complejo de Rips ----------------------------------------
-    plt.figure(figsize=(24, 10))
-    plt.scatter(centroides_x, centroides_y, color="black",
-                label="Centroides", s=5)
-    for simplex in simplex_tree.get_skeleton(1):
-        if len(simplex[0]) == 2:
-            i, j = simplex[0]
-            plt.plot([centroides_x[i], centroides_x[j]],
-                     [centroides_y[i], centroides_y[j]],
-                     color="gray", linewidth=0.5)
-    plt.title(f"Complejo de Rips (r={radio}) · {nombre_csv}")
-    plt.xlabel("X"); plt.ylabel("Y"); plt.legend(); plt.tight_layout()
-    plt.savefig(os.path.join(ruta_out,
-                             f"{nombre_base}_complejo_rips.png"))
-    plt.close()
-
-    # --- Diagrama de persistencia -------------------------------------------
-    diag = simplex_tree.persistence()
-    plt.figure(figsize=(6, 6))
-    gd.plot_persistence_diagram(diag)
-    plt.title(f"Diagrama de Persistencia (r={radio}) · {nombre_csv}")
-    plt.xlabel("Birth"); plt.ylabel("Death"); plt.tight_layout()
-    plt.savefig(os.path.join(ruta_out,
-                             f"{nombre_base}_diagrama_persistencia.png"))
-    plt.close()
-
-    # --- CSV con pares birth-death ------------------------------------------
-    diagram_df = pd.DataFrame(
-        [[dim, b, d] for dim, (b, d) in diag if dim <= 2],
-        columns=["dimension", "birth", "death"]
-    )
-    diagram_df.to_csv(os.path.join(ruta_out, f"{nombre_base}.csv"),
-                      index=False)
-    return nombre_csv  # para saber cuál terminó
+    # --- Imágenes (arrays ligeros para la cola de dibujo) --------------------
+    trabajos = _trabajos_figuras(simplex_tree, puntos, diag, radio,
+                                 nombre_csv, ruta_out,
+                                 aproximado=info is not None)
+    return nombre_csv, info, trabajos  # para saber cuál terminó
 
 
 # --------------------------------------------------------------------------- #
@@ -101,10 +168,18 @@ def _procesar_csv(nombre_csv: str, ruta_in: str, ruta_out: str, radio: float):
 # --------------------------------------------------------------------------- #
 def calcular_rips_y_persistencia(ruta_centroides: str,
                                  radio: float,
-                                 n_workers: int) -> str:
+                                 n_workers: int,
+                                 landmarks: int = None,
+                                 complejo: str = "rips",
+                                 semilla: int = 0,
+                                 render_workers: int = 1) -> str:
     """Prepara carpetas, lanza procesos y muestra progreso."""
     ruta_resultados = os.path.join(ruta_centroides, "resultados")
-    ruta_rips = os.path.join(ruta_resultados, f"rips_{radio}")
+    if landmarks is None:
+        ruta_rips = os.path.join(ruta_resultados, f"rips_{radio}")
+    else:
+        ruta_rips = os.path.join(ruta_resultados,
+                                 f"{complejo}_{radio}_landmarks_{landmarks}")
     os.makedirs(ruta_rips, exist_ok=True)
 
     # Archivos a procesar
@@ -123,13 +198,28 @@ def calcular_rips_y_persistencia(ruta_centroides: str,
     tarea = partial(_procesar_csv,
                     ruta_in=ruta_centroides,
                     ruta_out=ruta_rips,
-                    radio=radio)
+                    radio=radio,
+                    landmarks=landmarks,
+                    complejo=complejo,
+                    semilla=semilla)
 
-    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+    aproximaciones = []
+    with ColaFiguras(render_workers) as figuras, \
+            ProcessPoolExecutor(max_workers=n_workers) as executor:
         futures = {executor.submit(tarea, csv): csv for csv in archivos_csv}
-        for _ in tqdm(as_completed(futures), total=len(futures),
-                      desc=f"Procesando ({n_workers} núcleos)"):
-            pass  # tqdm se va actualizando
+        for fut in tqdm(as_completed(futures), total=len(futures),
+                        desc=f"Procesando ({n_workers} núcleos)"):
+            _, info, trabajos = fut.result()
+            figuras.enviar(trabajos)
+            if info is not None:
+                aproximaciones.append(info)
+
+    # Radio de cobertura y cota de error de cada diagrama aproximado
+    if aproximaciones:
+        nombre_tabla = f"{os.path.basename(ruta_rips)}_aproximacion.csv"
+        pd.DataFrame(aproximaciones, columns=COLUMNAS_APROXIMACION).sort_values(
+            "archivo").to_csv(os.path.join(ruta_resultados, nombre_tabla),
+                              index=False)
 
     print(f"\n Resultados guardados en: {ruta_rips}")
     print(f"  Tiempo total: {time.time() - inicio:.2f} s")
@@ -144,6 +234,17 @@ def parse_args():
     parser.add_argument("ruta_centroides", type=str, help="Ruta a la carpeta con archivos CSV")
     parser.add_argument("--radio", type=int, default=1000, help="Valor máximo de radio para el complejo de Rips (default=1000)")
     parser.add_argument("--workers", type=int, default=2, help="Número de núcleos para procesamiento paralelo (default=2)")
+    parser.add_argument("--render-workers", type=int, default=1, help="Procesos que dibujan las figuras, 0 = en serie (default=1)")
+    parser.add_argument("--tesela", type=int, default=None, help="Lado de tesela para láminas completas (default=sin teselado)")
+    parser.add_argument("--solape", type=int, default=None, help="Solape entre teselas, ≥ radio (default=radio)")
+    parser.add_argument("--h0-global", action="store_true", help="Unir H0 entre teselas de forma exacta (union-find)")
+    parser.add_argument("--landmarks", type=int, default=None, help="Número de landmarks maxmin (default=complejo exacto)")
+    parser.add_argument("--complejo", choices=COMPLEJOS, default="rips", help="Complejo sobre los landmarks: rips o witness (default=rips)")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del primer landmark (default=0)")
+    parser.add_argument("--motor", choices=MOTORES, default="rips", help="Filtración: rips o cubico sobre la densidad (default=rips)")
+    parser.add_argument("--pixel", type=int, default=50, help="Lado de píxel del raster de densidad (default=50)")
+    parser.add_argument("--ancho-banda", type=int, default=150, help="Desviación del kernel gaussiano de densidad (default=150)")
+    parser.add_argument("--filtracion", choices=FILTRACIONES, default="supernivel", help="Filtración cúbica: supernivel o subnivel (default=supernivel)")
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -153,6 +254,42 @@ if __name__ == "__main__":
         print(f" La ruta '{args.ruta_centroides}' no existe o no es directorio.")
         sys.exit(1)
 
-    calcular_rips_y_persistencia(args.ruta_centroides,
-                                 radio=args.radio,
-                                 n_workers=args.workers)
+    if args.complejo == "witness" and args.landmarks is None:
+        print(" El complejo witness requiere --landmarks.")
+        sys.exit(1)
+
+    if args.tesela is not None and args.landmarks is not None:
+        print(" El modo teselado no admite --landmarks ni --complejo witness.")
+        sys.exit(1)
+
+    if args.motor == "cubico" and (args.tesela is not None
+                                   or args.landmarks is not None):
+        print(" El motor cúbico no admite --tesela ni --landmarks.")
+        sys.exit(1)
+
+    if args.motor == "cubico":
+        calcular_cubico(args.ruta_centroides,
+                        pixel=args.pixel,
+                        ancho_banda=args.ancho_banda,
+                        filtracion=args.filtracion,
+                        n_workers=args.workers,
+                        render_workers=args.render_workers)
+    elif args.tesela is not None:
+        solape = args.radio if args.solape is None else args.solape
+        if solape < args.radio:
+            print(f" El solape ({solape}) debe ser ≥ radio ({args.radio}).")
+            sys.exit(1)
+        calcular_teselas(args.ruta_centroides,
+                         radio=args.radio,
+                         tam=args.tesela,
+                         solape=solape,
+                         n_workers=args.workers,
+                         con_h0_global=args.h0_global)
+    else:
+        calcular_rips_y_persistencia(args.ruta_centroides,
+                                     radio=args.radio,
+                                     n_workers=args.workers,
+                                     landmarks=args.landmarks,
+                                     complejo=args.complejo,
+                                     semilla=args.semilla,
+                                     render_workers=args.render_workers)
@@ -7,13 +7,25 @@ Genera complejos de Rips y diagramas de persistencia para subconjuntos celulares
 
 Ejecución
 ---------
-$ python rips_grupos.py /ruta/a/csvs [--radio 2000] [--workers 4]
+$ python rips_grupos.py /ruta/a/csvs [--radio 2000] [--workers 4] [--combinaciones]
+                        [--landmarks 300 [--complejo witness]]
+                        [--motor cubico [--pixel 50] [--ancho-banda 150]]
 
 Argumentos
 ----------
 ruta/a/csvs   : carpeta con archivos .csv con columnas 'X_centroid', 'Y_centroid', 'phenotype_key'
 --radio       : radio máximo (max_edge_length) para el complejo de Rips (float, default 2000)
 --workers     : núcleos para procesamiento paralelo (int, default = 4)
+--render-workers : procesos que dibujan los PNG en segundo plano (default 1;
+                0 = en serie, ver figuras.py)
+--combinaciones : procesa también las uniones de 2, 3 y 4 grupos
+--landmarks   : número de landmarks maxmin por grupo (aproximado, ver landmarks.py)
+--complejo    : 'rips' (default) o 'witness' sobre los landmarks
+--semilla     : semilla del primer landmark (default 0)
+--motor       : 'rips' (default) o 'cubico' (densidad por grupo, ver cubico.py)
+--pixel       : lado de píxel del raster en modo cúbico (default 50)
+--ancho-banda : desviación del kernel gaussiano de densidad (default 150)
+--filtracion  : 'supernivel' (default) o 'subnivel' en modo cúbico
 
 Salidas
 -------
@@ -24,6 +36,21 @@ Por cada archivo y grupo:
 
 Todos los resultados se guardan en:
     <ruta_csvs>/resultados/rips_grupos_<radio>/
+y las combinaciones (p. ej. 'tumorales+linfoides') en una subcarpeta con su
+nombre.
+
+Las aristas de Rips se calculan una sola vez por lámina sobre la unión de los
+grupos; cada grupo o combinación usa el subcomplejo inducido por sus células
+(ver complejo_union.py).
+
+Con --landmarks van a <complejo>_grupos_<radio>_landmarks_<N>/ y la tabla
+<complejo>_grupos_<radio>_landmarks_<N>_aproximacion.csv registra el radio de
+cobertura y la cota bottleneck de cada diagrama, válida con las muertes
+recortadas a radio (ver landmarks.py).
+
+Con --motor cubico cada grupo se rasteriza en la misma rejilla de la lámina,
+<nombre_archivo>_<grupo>_densidad.png sustituye a la imagen del complejo y
+los resultados van a cubico_grupos_<filtracion>_<pixel>_<ancho_banda>/.
 """
 
 import os
@@ -31,12 +58,18 @@ import sys
 import argparse
 import numpy as np
 import pandas as pd
-import gudhi as gd
-import matplotlib.pyplot as plt
 from tqdm import tqdm
 from functools import partial
+from itertools import combinations
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from landmarks import COMPLEJOS, COLUMNAS_APROXIMACION, diagrama_aproximado
+from complejo_union import aristas_union, simplex_tree_inducido
+from cubico import (MOTORES, FILTRACIONES, diagrama_cubico,
+                    limites_raster, trabajos_figuras_cubico)
+from figuras import (ColaFiguras, aristas_simplex_tree, array_persistencia,
+                     figura_complejo, figura_diagrama)
+
 # Grupos celulares
 GRUPOS = {
     'tumorales': ['tumor cells', 'Ki67+ tumor cells'],
@@ -47,69 +80,137 @@ GRUPOS = {
     'no_tumorales': ['endothelial cells', 'stromal cells']
 }
 
+# Uniones de dos o más grupos (análisis por combinaciones)
+COMBINACIONES = {
+    '+'.join(comb): [t for g in comb for t in GRUPOS[g]]
+    for k in range(2, len(GRUPOS) + 1)
+    for comb in combinations(GRUPOS, k)
+}
+
 # --------------------------------------------------------------------------- #
 # FUNCIÓN PARA PROCESAR UN SOLO ARCHIVO
 # --------------------------------------------------------------------------- #
-def procesar_archivo(nombre_csv, ruta_in, ruta_out, radio):
-    """Procesa un archivo CSV generando Rips y persistencia por grupo celular"""
+def procesar_archivo(nombre_csv, ruta_in, ruta_out, radio,
+                     landmarks=None, complejo="rips", semilla=0,
+                     combinaciones=False, motor="rips", pixel=50,
+                     ancho_banda=150, filtracion="supernivel"):
+    """Procesa un archivo CSV generando Rips y persistencia por grupo celular.
+
+    Las figuras se devuelven como trabajos para la cola de dibujo del proceso
+    principal (ver figuras.py).
+    """
     ruta_csv = os.path.join(ruta_in, nombre_csv)
     df = pd.read_csv(ruta_csv)
+    aproximaciones = []
+    trabajos = []
+
+    # Subconjuntos a procesar: (nombre, tipos, carpeta de salida)
+    subconjuntos = [(grupo, tipos, ruta_out) for grupo, tipos in GRUPOS.items()]
+    if combinaciones:
+        subconjuntos += [(comb, tipos, os.path.join(ruta_out, comb))
+                         for comb, tipos in COMBINACIONES.items()]
+
+    # Con --combinaciones, aristas de la unión de todos los grupos: una sola
+    # búsqueda de vecinos por lámina y cada subconjunto es un subcomplejo
+    # inducido.  Sin combinaciones los grupos son disjuntos y ninguna arista
+    # entre grupos se usa, así que cada uno busca sólo sobre sus células.
+    en_grupo = df["phenotype"].isin(
+        [t for tipos in GRUPOS.values() for t in tipos]).to_numpy()
+    todos = df.loc[en_grupo, ["X_centroid", "Y_centroid"]].to_numpy()
+    fenotipos = df.loc[en_grupo, "phenotype"].to_numpy()
+    if motor == "cubico":
+        # Misma rejilla para todos los grupos de la lámina
+        limites = limites_raster(todos, ancho_banda) if len(todos) else None
+    elif landmarks is None and combinaciones:
+        pares, longitudes = aristas_union(todos, radio)
 
-    for grupo, tipos in GRUPOS.items():
-        df_grupo = df[df["phenotype"].isin(tipos)]
-        if df_grupo.empty:
+    for grupo, tipos, carpeta in subconjuntos:
+        mascara = np.isin(fenotipos, tipos)
+        if not mascara.any():
             continue
 
-        puntos = df_grupo[["X_centroid", "Y_centroid"]].to_numpy()
+        puntos = todos[mascara]
         if len(puntos) < 2:
             continue
 
-        rips_complex = gd.RipsComplex(points=puntos, max_edge_length=radio)
-        simplex_tree = rips_complex.create_simplex_tree(max_dimension=2)
-
         base = os.path.splitext(nombre_csv)[0]
         nombre_out = f"{base}_{grupo}"
 
-        # Imagen del complejo
-        plt.figure(figsize=(24, 10))
-        plt.scatter(puntos[:, 0], puntos[:, 1], color="black", s=5, label="Centroides")
-        for simplex in simplex_tree.get_skeleton(1):
-            if len(simplex[0]) == 2:
-                i, j = simplex[0]
-                plt.plot([puntos[i][0], puntos[j][0]],
-                         [puntos[i][1], puntos[j][1]],
-                         color="gray", linewidth=0.5)
-        plt.title(f"Rips ({grupo}) · {nombre_csv}")
-        plt.xlabel("X"); plt.ylabel("Y"); plt.legend(); plt.tight_layout()
-        plt.savefig(os.path.join(ruta_out, f"{nombre_out}_complejo_rips.png"))
-        plt.close()
+        if motor == "cubico":
+            densidad, extension, diag = diagrama_cubico(
+                puntos, pixel, ancho_banda, filtracion, limites)
+            trabajos += trabajos_figuras_cubico(
+                densidad, extension, diag, f"{grupo} · {nombre_csv}",
+                os.path.join(carpeta, nombre_out))
+            pd.DataFrame(
+                [[dim, b, d] for dim, (b, d) in diag],
+                columns=["dimension", "birth", "death"]
+            ).to_csv(os.path.join(carpeta, f"{nombre_out}.csv"), index=False)
+            continue
+
+        if landmarks is None:
+            if combinaciones:
+                simplex_tree, aristas = simplex_tree_inducido(
+                    pares, longitudes, mascara)
+            else:
+                simplex_tree, aristas = simplex_tree_inducido(
+                    *aristas_union(puntos, radio),
+                    np.ones(len(puntos), dtype=bool))
+            diag = simplex_tree.persistence()
+        else:
+            simplex_tree, puntos, diag, info = diagrama_aproximado(
+                puntos, radio, landmarks, complejo, semilla)
+            aproximaciones.append({"archivo": f"{nombre_out}.csv", **info})
+            aristas = aristas_simplex_tree(simplex_tree)
+
+        # Imagen del complejo (aristas como array para la cola de dibujo)
+        trabajos.append((figura_complejo,
+                         (puntos, aristas,
+                          f"Rips ({grupo}) · {nombre_csv}",
+                          os.path.join(carpeta,
+                                       f"{nombre_out}_complejo_rips.png"))))
 
         # Diagrama de persistencia
-        diag = simplex_tree.persistence()
         diagram_df = pd.DataFrame(
             [[dim, b, d] for dim, (b, d) in diag if dim <= 2],
             columns=["dimension", "birth", "death"]
         )
-        diagram_df.to_csv(os.path.join(ruta_out, f"{nombre_out}.csv"),
+        diagram_df.to_csv(os.path.join(carpeta, f"{nombre_out}.csv"),
                           index=False)
 
-        plt.figure(figsize=(6, 6))
-        gd.plot_persistence_diagram(diag)
-        plt.title(f"Persistencia ({grupo}) · {nombre_csv}")
-        plt.xlabel("Birth"); plt.ylabel("Death"); plt.tight_layout()
-        plt.savefig(os.path.join(ruta_out, f"{nombre_out}_diagrama_persistencia.png"))
-        plt.close()
+        trabajos.append((figura_diagrama,
+                         (array_persistencia(diag),
+                          f"Persistencia ({grupo}) · {nombre_csv}",
+                          os.path.join(carpeta,
+                                       f"{nombre_out}_diagrama_persistencia.png"))))
 
-    return nombre_csv
+    return nombre_csv, aproximaciones, trabajos
 
 # --------------------------------------------------------------------------- #
 # FUNCIÓN PRINCIPAL
 # --------------------------------------------------------------------------- #
-def calcular_rips_grupos(ruta_csvs: str, radio: float, n_workers: int):
+def calcular_rips_grupos(ruta_csvs: str, radio: float, n_workers: int,
+                         landmarks: int = None, complejo: str = "rips",
+                         semilla: int = 0, combinaciones: bool = False,
+                         motor: str = "rips", pixel: int = 50,
+                         ancho_banda: int = 150,
+                         filtracion: str = "supernivel",
+                         render_workers: int = 1):
     """Ejecuta el procesamiento paralelo de todos los CSV"""
     ruta_resultados = os.path.join(ruta_csvs, "resultados")
-    ruta_out = os.path.join(ruta_resultados, f"rips_grupos_{radio}")
+    if motor == "cubico":
+        ruta_out = os.path.join(
+            ruta_resultados,
+            f"cubico_grupos_{filtracion}_{pixel}_{ancho_banda}")
+    elif landmarks is None:
+        ruta_out = os.path.join(ruta_resultados, f"rips_grupos_{radio}")
+    else:
+        ruta_out = os.path.join(
+            ruta_resultados, f"{complejo}_grupos_{radio}_landmarks_{landmarks}")
     os.makedirs(ruta_out, exist_ok=True)
+    if combinaciones:
+        for comb in COMBINACIONES:
+            os.makedirs(os.path.join(ruta_out, comb), exist_ok=True)
 
     archivos = sorted(f for f in os.listdir(ruta_csvs) if f.endswith(".csv"))
     if not archivos:
@@ -117,13 +218,27 @@ def calcular_rips_grupos(ruta_csvs: str, radio: float, n_workers: int):
         return ruta_out
 
     print(f"Procesando {len(archivos)} archivos con {n_workers} núcleos...")
-    tarea = partial(procesar_archivo, ruta_in=ruta_csvs, ruta_out=ruta_out, radio=radio)
+    tarea = partial(procesar_archivo, ruta_in=ruta_csvs, ruta_out=ruta_out, radio=radio,
+                    landmarks=landmarks, complejo=complejo, semilla=semilla,
+                    combinaciones=combinaciones, motor=motor, pixel=pixel,
+                    ancho_banda=ancho_banda, filtracion=filtracion)
 
-    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+    aproximaciones = []
+    with ColaFiguras(render_workers) as figuras, \
+            ProcessPoolExecutor(max_workers=n_workers) as executor:
         futures = {executor.submit(tarea, csv): csv for csv in archivos}
-        for _ in tqdm(as_completed(futures), total=len(futures),
-                      desc="Procesando archivos", unit="archivo"):
-            pass
+        for fut in tqdm(as_completed(futures), total=len(futures),
+                        desc="Procesando archivos", unit="archivo"):
+            _, aprox, trabajos = fut.result()
+            figuras.enviar(trabajos)
+            aproximaciones.extend(aprox)
+
+    # Radio de cobertura y cota de error de cada diagrama aproximado
+    if aproximaciones:
+        nombre_tabla = f"{os.path.basename(ruta_out)}_aproximacion.csv"
+        pd.DataFrame(aproximaciones, columns=COLUMNAS_APROXIMACION).sort_values(
+            "archivo").to_csv(os.path.join(ruta_resultados, nombre_tabla),
+                              index=False)
 
     print(f"\nResultados guardados en: {ruta_out}")
     return ruta_out
@@ -136,6 +251,15 @@ def parse_args():
     parser.add_argument("ruta_csvs", type=str, help="Ruta a carpeta con archivos CSV")
     parser.add_argument("--radio", type=int, default=2000, help="Radio máximo para Rips (default=2000)")
     parser.add_argument("--workers", type=int, default=4, help="Núcleos para procesamiento paralelo (default=4)")
+    parser.add_argument("--render-workers", type=int, default=1, help="Procesos que dibujan las figuras, 0 = en serie (default=1)")
+    parser.add_argument("--combinaciones", action="store_true", help="Procesar también las uniones de grupos")
+    parser.add_argument("--landmarks", type=int, default=None, help="Landmarks maxmin por grupo (default=complejo exacto)")
+    parser.add_argument("--complejo", choices=COMPLEJOS, default="rips", help="Complejo sobre los landmarks: rips o witness (default=rips)")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del primer landmark (default=0)")
+    parser.add_argument("--motor", choices=MOTORES, default="rips", help="Filtración: rips o cubico sobre la densidad (default=rips)")
+    parser.add_argument("--pixel", type=int, default=50, help="Lado de píxel del raster de densidad (default=50)")
+    parser.add_argument("--ancho-banda", type=int, default=150, help="Desviación del kernel gaussiano de densidad (default=150)")
+    parser.add_argument("--filtracion", choices=FILTRACIONES, default="supernivel", help="Filtración cúbica: supernivel o subnivel (default=supernivel)")
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -145,4 +269,17 @@ if __name__ == "__main__":
         print(f"La ruta '{args.ruta_csvs}' no existe o no es un directorio.")
         sys.exit(1)
 
-    calcular_rips_grupos(args.ruta_csvs, radio=args.radio, n_workers=args.workers)
+    if args.complejo == "witness" and args.landmarks is None:
+        print("El complejo witness requiere --landmarks.")
+        sys.exit(1)
+
+    if args.motor == "cubico" and args.landmarks is not None:
+        print("El motor cúbico no admite --landmarks.")
+        sys.exit(1)
+
+    calcular_rips_grupos(args.ruta_csvs, radio=args.radio, n_workers=args.workers,
+                         landmarks=args.landmarks, complejo=args.complejo,
+                         semilla=args.semilla, combinaciones=args.combinaciones,
+                         motor=args.motor, pixel=args.pixel,
+                         ancho_banda=args.ancho_banda, filtracion=args.filtracion,
+                         render_workers=args.render_workers)
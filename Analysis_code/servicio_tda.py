@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servicio TDA persistente para revisión interactiva de láminas.
+
+Cada ejecución de rips.py / distancias.py paga la importación de gudhi,
+pandas y matplotlib en cada proceso y vuelve a leer todos los diagramas del
+disco.  Este servicio HTTP local arranca una sola vez: mantiene un pool de
+procesos ya inicializados (sin matplotlib, que rips.py importa de forma
+diferida) y la cohorte de diagramas en memoria de cada worker.
+
+Ejecución
+---------
+$ python servicio_tda.py /ruta/a/rips_1000 [--radio 1000] [--workers 4]
+                         [--puerto 8765] [--tau 5] [--top-k 200]
+
+Argumentos
+----------
+/ruta/a/rips_1000 : carpeta con los diagramas <nombre>.csv de la cohorte.
+--radio           : radio de Rips para las láminas nuevas (debe coincidir con
+                    el de la cohorte, default 1000).
+--workers         : procesos del pool (default 4).
+--puerto          : puerto en 127.0.0.1 (default 8765).
+--tau / --top-k   : poda de diagramas al cargar (ver poda.py).
+
+Endpoints
+---------
+GET  /estado      tamaño de la cohorte, radio y workers.
+GET  /cohorte     nombres de los diagramas cargados.
+POST /diagrama    cuerpo = CSV de células (X_centroid, Y_centroid);
+                  devuelve el diagrama {"dimension", "birth", "death"}.
+POST /distancias  cuerpo = CSV de células o CSV de diagrama
+                  (dimension, birth, death); devuelve las distancias de
+                  Wasserstein dim 0 y dim 1 a cada diagrama de la cohorte.
+
+En JSON las muertes infinitas se devuelven como null.
+
+Ejemplo
+-------
+$ curl --data-binary @Carcinoma_AGSCC_2_1.csv localhost:8765/distancias
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import gudhi.wasserstein as gw
+
+from rips import calcular_diagrama, tabla_diagrama
+from poda import podar_diagrama
+
+
+# Estado de cada worker: la cohorte se copia una vez en el initializer
+_COHORTE = {}
+
+
+# --------------------------------------------------------------------------- #
+#  CARGA DE LA COHORTE
+# --------------------------------------------------------------------------- #
+def _dividir_dimensiones(df: pd.DataFrame):
+    """Tabla de diagrama → (diag_dim0, diag_dim1)."""
+    diag0 = df[df["dimension"] == 0][["birth", "death"]].to_numpy(dtype=float)
+    diag1 = df[df["dimension"] == 1][["birth", "death"]].to_numpy(dtype=float)
+    return diag0, diag1
+
+
+def cargar_cohorte(ruta_dir: str, tau: float = None, top_k: int = None):
+    """Lee (y poda) todos los diagramas de la carpeta."""
+    nombres, diags0, diags1 = [], [], []
+    for nombre in sorted(os.listdir(ruta_dir)):
+        if not nombre.lower().endswith(".csv"):
+            continue
+        df = pd.read_csv(os.path.join(ruta_dir, nombre))
+        if not {"dimension", "birth", "death"}.issubset(df.columns):
+            print(f" {nombre}: no es un diagrama, se omite.")
+            continue
+        d0, d1 = _dividir_dimensiones(df)
+        if tau is not None or top_k is not None:
+            d0, _ = podar_diagrama(d0, tau, top_k)
+            d1, _ = podar_diagrama(d1, tau, top_k)
+        nombres.append(nombre)
+        diags0.append(d0)
+        diags1.append(d1)
+    return nombres, diags0, diags1
+
+
+# --------------------------------------------------------------------------- #
+#  TAREAS DE LOS WORKERS
+# --------------------------------------------------------------------------- #
+def _iniciar_worker(diags0, diags1, tau, top_k):
+    """Guarda la cohorte y los parámetros de poda en el proceso."""
+    _COHORTE.update(diags0=diags0, diags1=diags1, tau=tau, top_k=top_k)
+
+
+def _calentar(_):
+    """Tarea vacía: fuerza el arranque del proceso antes de la primera consulta."""
+    return os.getpid()
+
+
+def _puntos(tabla: pd.DataFrame) -> np.ndarray:
+    """Coordenadas de los centroides de una tabla de células."""
+    if not {"X_centroid", "Y_centroid"}.issubset(tabla.columns):
+        raise ValueError("La tabla de células debe tener columnas "
+                         "'X_centroid' e 'Y_centroid'.")
+    return tabla[["X_centroid", "Y_centroid"]].to_numpy()
+
+
+def _diagrama_celulas(puntos: np.ndarray, radio: float) -> pd.DataFrame:
+    _, _, diag, _ = calcular_diagrama(puntos, radio)
+    return tabla_diagrama(diag)
+
+
+def _distancias_bloque(diag0, diag1, indices):
+    """Wasserstein (orden 1) del diagrama a un bloque de la cohorte."""
+    tau, top_k = _COHORTE["tau"], _COHORTE["top_k"]
+    if tau is not None or top_k is not None:
+        diag0, _ = podar_diagrama(diag0, tau, top_k)
+        diag1, _ = podar_diagrama(diag1, tau, top_k)
+    w0 = [gw.wasserstein_distance(diag0, _COHORTE["diags0"][k], order=1)
+          for k in indices]
+    w1 = [gw.wasserstein_distance(diag1, _COHORTE["diags1"][k], order=1)
+          for k in indices]
+    return w0, w1
+
+
+# --------------------------------------------------------------------------- #
+#  SERVICIO
+# --------------------------------------------------------------------------- #
+class ServicioTDA:
+    """Pool de procesos caliente + cohorte en memoria."""
+
+    def __init__(self, ruta_cohorte: str, radio: float, workers: int,
+                 tau: float = None, top_k: int = None):
+        self.radio = radio
+        self.workers = workers
+        self.nombres, diags0, diags1 = cargar_cohorte(ruta_cohorte, tau, top_k)
+        self.pool = ProcessPoolExecutor(max_workers=workers,
+                                        initializer=_iniciar_worker,
+                                        initargs=(diags0, diags1, tau, top_k))
+        # Arrancar todos los procesos ahora y no en la primera petición
+        list(self.pool.map(_calentar, range(workers)))
+
+    def diagrama(self, puntos: np.ndarray) -> pd.DataFrame:
+        return self.pool.submit(_diagrama_celulas, puntos, self.radio).result()
+
+    def distancias(self, tabla: pd.DataFrame) -> pd.DataFrame:
+        """Distancias a la cohorte de una tabla de células o de diagrama."""
+        if {"X_centroid", "Y_centroid"}.issubset(tabla.columns):
+            tabla = self.diagrama(_puntos(tabla))
+        elif not {"dimension", "birth", "death"}.issubset(tabla.columns):
+            raise ValueError("Se esperaba una tabla de células "
+                             "(X_centroid, Y_centroid) o de diagrama "
+                             "(dimension, birth, death).")
+        diag0, diag1 = _dividir_dimensiones(tabla)
+
+        bloques = np.array_split(np.arange(len(self.nombres)), self.workers)
+        futures = [self.pool.submit(_distancias_bloque, diag0, diag1, b)
+                   for b in bloques if len(b)]
+        w0, w1 = [], []
+        for fut in futures:
+            b0, b1 = fut.result()
+            w0.extend(b0)
+            w1.extend(b1)
+        return pd.DataFrame({"archivo": self.nombres,
+                             "wasserstein_dim0": w0,
+                             "wasserstein_dim1": w1})
+
+    def cerrar(self):
+        self.pool.shutdown()
+
+
+def _a_json(df: pd.DataFrame) -> dict:
+    """DataFrame → dict de listas, con inf como null."""
+    return {c: [None if isinstance(v, float) and not np.isfinite(v) else v
+                for v in df[c].tolist()]
+            for c in df.columns}
+
+
+def crear_manejador(servicio: ServicioTDA):
+    """Clase de manejador HTTP ligada a un servicio."""
+
+    class Manejador(BaseHTTPRequestHandler):
+
+        def _responder(self, codigo: int, cuerpo: dict):
+            datos = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def _leer_tabla(self) -> pd.DataFrame:
+            largo = int(self.headers.get("Content-Length", 0))
+            texto = self.rfile.read(largo).decode("utf-8")
+            return pd.read_csv(io.StringIO(texto))
+
+        def do_GET(self):
+            if self.path == "/estado":
+                self._responder(200, {"n_cohorte": len(servicio.nombres),
+                                      "radio": servicio.radio,
+                                      "workers": servicio.workers})
+            elif self.path == "/cohorte":
+                self._responder(200, {"archivo": servicio.nombres})
+            else:
+                self._responder(404, {"error": f"Ruta '{self.path}' no existe."})
+
+        def do_POST(self):
+            t0 = time.time()
+            try:
+                tabla = self._leer_tabla()
+                if self.path == "/diagrama":
+                    res = servicio.diagrama(_puntos(tabla))
+                elif self.path == "/distancias":
+                    res = servicio.distancias(tabla)
+                else:
+                    self._responder(404, {"error": f"Ruta '{self.path}' no existe."})
+                    return
+                respuesta = {**_a_json(res),
+                             "segundos": round(time.time() - t0, 3)}
+            except (ValueError, pd.errors.ParserError) as e:
+                self._responder(400, {"error": str(e)})
+                return
+            except Exception as e:
+                # Fallos del worker (gudhi, tabla mal formada...): responder
+                # siempre en lugar de cortar la conexión
+                self.log_error("%s: %s", type(e).__name__, e)
+                self._responder(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._responder(200, respuesta)
+
+    return Manejador
+
+
+# --------------------------------------------------------------------------- #
+#  CLI
+# --------------------------------------------------------------------------- #
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Servicio local con diagramas de la cohorte en memoria.")
+    p.add_argument("ruta", help="Carpeta con los diagramas CSV de la cohorte")
+    p.add_argument("--radio", type=int, default=1000,
+                   help="Radio de Rips para láminas nuevas (default=1000)")
+    p.add_argument("--workers", type=int, default=4,
+                   help="Procesos del pool (default=4)")
+    p.add_argument("--puerto", type=int, default=8765,
+                   help="Puerto en 127.0.0.1 (default=8765)")
+    p.add_argument("--tau", type=float, default=None,
+                   help="Podar puntos con persistencia < tau (default=sin poda)")
+    p.add_argument("--top-k", type=int, default=None,
+                   help="Conservar los K puntos más persistentes (default=todos)")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not os.path.isdir(args.ruta):
+        print(f" La ruta '{args.ruta}' no existe o no es un directorio.")
+        sys.exit(1)
+
+    t0 = time.time()
+    servicio = ServicioTDA(args.ruta, radio=args.radio, workers=args.workers,
+                           tau=args.tau, top_k=args.top_k)
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.puerto),
+                                   crear_manejador(servicio))
+    print(f" Cohorte: {len(servicio.nombres)} diagramas · "
+          f"{args.workers} workers listos en {time.time() - t0:.2f} s")
+    print(f" Escuchando en http://127.0.0.1:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modo teselado para láminas completas (10⁵–10⁶ centroides).
+
+A ese tamaño un complejo de Rips global es inviable, así que la lámina se
+divide en teselas cuadradas de lado ``tam`` y cada tesela se amplía con un
+margen ``solape`` (≥ radio).  La persistencia se calcula por tesela en
+paralelo y la memoria queda acotada por el número de células de una tesela
+ampliada.
+
+Opcionalmente se reconstruye H0 de toda la lámina de forma exacta: con
+solape ≥ radio cualquier arista de longitud ≤ radio cae completa dentro de
+alguna tesela ampliada, y el bosque generador mínimo global está contenido en
+la unión de los bosques mínimos de cada tesela.  Basta entonces un Kruskal con
+union-find sobre esas aristas.
+
+Salidas (por lámina <nombre>.csv)
+---------------------------------
+    <nombre>_teselas.csv            una fila por tesela con sus coordenadas
+                                    y resumen topológico (mapa espacial)
+    <nombre>_teselas_diagramas.csv  pares birth–death con columna 'tesela'
+    <nombre>_h0_global.csv          (opcional) H0 exacto de toda la lámina
+"""
+
+import os
+import time
+from concurrent.futures import (ProcessPoolExecutor, FIRST_COMPLETED, wait)
+
+import numpy as np
+import pandas as pd
+import gudhi as gd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree
+from scipy.spatial import cKDTree
+from tqdm import tqdm
+
+
+COLUMNAS_TESELA = [
+    "tesela", "fila", "columna", "x0", "y0", "x1", "y1",
+    "n_celulas", "n_celulas_ampliada",
+    "n_h0", "n_h1", "persistencia_total_h0", "persistencia_total_h1",
+    "persistencia_max_h1",
+]
+
+
+# --------------------------------------------------------------------------- #
+#  PARTICIÓN EN TESELAS
+# --------------------------------------------------------------------------- #
+def generar_teselas(puntos: np.ndarray, tam: float, solape: float):
+    """
+    Recorre las teselas no vacías de la lámina.
+
+    Produce tuplas ``(fila, columna, caja, indices, n_nucleo)`` donde ``caja``
+    es ``(x0, y0, x1, y1)`` del núcleo de la tesela, ``indices`` son los
+    índices (globales) de los puntos de la tesela ampliada y ``n_nucleo`` el
+    número de esos puntos que caen en el núcleo.
+    """
+    x, y = puntos[:, 0], puntos[:, 1]
+    x_min, y_min = x.min(), y.min()
+    n_col = int(np.floor((x.max() - x_min) / tam)) + 1
+    n_fil = int(np.floor((y.max() - y_min) / tam)) + 1
+
+    orden_x = np.argsort(x, kind="stable")
+    x_ord = x[orden_x]
+
+    for c in range(n_col):
+        x0 = x_min + c * tam
+        x1 = x0 + tam
+        a = np.searchsorted(x_ord, x0 - solape, side="left")
+        b = np.searchsorted(x_ord, x1 + solape, side="right")
+        if a == b:
+            continue
+        banda = orden_x[a:b]
+        orden_y = np.argsort(y[banda], kind="stable")
+        banda = banda[orden_y]
+        y_banda = y[banda]
+
+        for f in range(n_fil):
+            y0 = y_min + f * tam
+            y1 = y0 + tam
+            p = np.searchsorted(y_banda, y0 - solape, side="left")
+            q = np.searchsorted(y_banda, y1 + solape, side="right")
+            indices = banda[p:q]
+            if len(indices) == 0:
+                continue
+            px, py = x[indices], y[indices]
+            n_nucleo = int(np.count_nonzero(
+                (px >= x0) & (px < x1) & (py >= y0) & (py < y1)))
+            if n_nucleo == 0:
+                continue  # sólo margen: la cubre una tesela vecina
+            yield f, c, (x0, y0, x1, y1), indices, n_nucleo
+
+
+# --------------------------------------------------------------------------- #
+#  TRABAJO POR TESELA (se ejecuta en cada proceso)
+# --------------------------------------------------------------------------- #
+def _bosque_minimo(puntos: np.ndarray, radio: float):
+    """Aristas (locales) y longitudes del bosque generador mínimo a escala radio."""
+    n = len(puntos)
+    pares = cKDTree(puntos).query_pairs(radio, output_type="ndarray")
+    if len(pares) == 0:
+        return np.empty((0, 2), dtype=np.int64), np.empty(0)
+    longitudes = np.linalg.norm(puntos[pares[:, 0]] - puntos[pares[:, 1]],
+                                axis=1)
+    # csgraph ignora los pesos nulos: centroides duplicados se desplazan a
+    # un peso mínimo y luego se restaura la longitud real.
+    pesos = np.maximum(longitudes, np.finfo(float).tiny)
+    grafo = coo_matrix((pesos, (pares[:, 0], pares[:, 1])), shape=(n, n))
+    arbol = minimum_spanning_tree(grafo).tocoo()
+    aristas = np.column_stack((arbol.row, arbol.col)).astype(np.int64)
+    longitudes = np.linalg.norm(puntos[aristas[:, 0]] - puntos[aristas[:, 1]],
+                                axis=1)
+    return aristas, longitudes
+
+
+def _procesar_tesela(puntos: np.ndarray, radio: float, con_bosque: bool):
+    """Calcula el diagrama de una tesela ampliada y, si se pide, su bosque."""
+    rips_complex = gd.RipsComplex(points=puntos, max_edge_length=radio)
+    simplex_tree = rips_complex.create_simplex_tree(max_dimension=2)
+    diag = np.array([[dim, b, d] for dim, (b, d) in simplex_tree.persistence()
+                     if dim <= 2], dtype=float).reshape(-1, 3)
+
+    if con_bosque:
+        aristas, longitudes = _bosque_minimo(puntos, radio)
+    else:
+        aristas, longitudes = None, None
+    return diag, aristas, longitudes
+
+
+def resumen_tesela(diag: np.ndarray) -> dict:
+    """Resumen de un diagrama (filas dimension, birth, death); las sumas y
+    máximos sólo cuentan pares finitos."""
+    dims = diag[:, 0]
+    pers = diag[:, 2] - diag[:, 1]
+    finitos = np.isfinite(pers)
+    h0 = pers[(dims == 0) & finitos]
+    h1 = pers[(dims == 1) & finitos]
+    return {
+        "n_h0": int(np.count_nonzero(dims == 0)),
+        "n_h1": int(np.count_nonzero(dims == 1)),
+        "persistencia_total_h0": float(h0.sum()),
+        "persistencia_total_h1": float(h1.sum()),
+        "persistencia_max_h1": float(h1.max()) if len(h1) else 0.0,
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  H0 GLOBAL CON UNION-FIND
+# --------------------------------------------------------------------------- #
+def h0_global(n: int, aristas: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Diagrama H0 exacto de la lámina a partir de las aristas candidatas.
+
+    Kruskal con union-find (compresión de caminos y unión por rango).
+    Devuelve filas ``(0, 0, death)``; las componentes que sobreviven al radio
+    aparecen con death = inf, igual que en ``simplex_tree.persistence()``.
+    """
+    padre = np.arange(n)
+    rango = np.zeros(n, dtype=np.int8)
+
+    def raiz(i):
+        r = i
+        while padre[r] != r:
+            r = padre[r]
+        while padre[i] != r:
+            padre[i], i = r, padre[i]
+        return r
+
+    orden = np.argsort(longitudes, kind="stable")
+    muertes = []
+    n_uniones = 0
+    for k in orden:
+        a, b = raiz(aristas[k, 0]), raiz(aristas[k, 1])
+        if a == b:
+            continue
+        if rango[a] < rango[b]:
+            a, b = b, a
+        padre[b] = a
+        if rango[a] == rango[b]:
+            rango[a] += 1
+        n_uniones += 1
+        muertes.append(longitudes[k])
+        if n_uniones == n - 1:
+            break
+
+    # Igual que gudhi, se omiten los pares de persistencia nula
+    muertes = np.asarray(muertes, dtype=float)
+    muertes = muertes[muertes > 0]
+    muertes = np.concatenate((muertes, np.full(n - n_uniones, np.inf)))
+    return np.column_stack((np.zeros_like(muertes), np.zeros_like(muertes),
+                            muertes))
+
+
+# --------------------------------------------------------------------------- #
+#  FUNCIÓN QUE PROCESA UNA LÁMINA COMPLETA
+# --------------------------------------------------------------------------- #
+def procesar_csv_teselas(nombre_csv: str, ruta_in: str, ruta_out: str,
+                         radio: float, tam: float, solape: float,
+                         n_workers: int, con_h0_global: bool = False) -> str:
+    """Lee una lámina, reparte sus teselas entre procesos y guarda tablas."""
+    if solape < radio:
+        raise ValueError(f"El solape ({solape}) debe ser ≥ radio ({radio}).")
+
+    df = pd.read_csv(os.path.join(ruta_in, nombre_csv),
+                     usecols=["X_centroid", "Y_centroid"])
+    puntos = df[["X_centroid", "Y_centroid"]].to_numpy(dtype=float)
+    del df
+
+    nombre_base = os.path.splitext(nombre_csv)[0]
+    ruta_diagramas = os.path.join(ruta_out, f"{nombre_base}_teselas_diagramas.csv")
+
+    filas_tesela = []
+    aristas_h0, longitudes_h0 = [], []
+    max_en_vuelo = 2 * n_workers
+
+    with open(ruta_diagramas, "w") as f_diag, \
+            ProcessPoolExecutor(max_workers=n_workers) as executor:
+        f_diag.write("tesela,dimension,birth,death\n")
+        en_vuelo = {}
+        teselas = generar_teselas(puntos, tam, solape)
+        barra = tqdm(desc=f"{nombre_base} (teselas)", unit="tesela")
+
+        def recoger(hechos):
+            for fut in hechos:
+                id_tesela, meta, indices = en_vuelo.pop(fut)
+                diag, aristas, longitudes = fut.result()
+                filas_tesela.append({"tesela": id_tesela, **meta,
+                                     **resumen_tesela(diag)})
+                pd.DataFrame({"tesela": id_tesela,
+                              "dimension": diag[:, 0].astype(int),
+                              "birth": diag[:, 1], "death": diag[:, 2]}
+                             ).to_csv(f_diag, header=False, index=False)
+                if aristas is not None and len(aristas):
+                    aristas_h0.append(indices[aristas])
+                    longitudes_h0.append(longitudes)
+                barra.update()
+
+        # Sólo se mantienen 2·workers teselas en vuelo: memoria acotada
+        for id_tesela, (f, c, caja, indices, n_nucleo) in enumerate(teselas):
+            if len(en_vuelo) >= max_en_vuelo:
+                hechos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                recoger(hechos)
+            meta = {"fila": f, "columna": c,
+                    "x0": caja[0], "y0": caja[1], "x1": caja[2], "y1": caja[3],
+                    "n_celulas": n_nucleo, "n_celulas_ampliada": len(indices)}
+            fut = executor.submit(_procesar_tesela, puntos[indices], radio,
+                                  con_h0_global)
+            en_vuelo[fut] = (id_tesela, meta, indices)
+        while en_vuelo:
+            hechos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            recoger(hechos)
+        barra.close()
+
+    pd.DataFrame(filas_tesela, columns=COLUMNAS_TESELA).sort_values(
+        "tesela").to_csv(os.path.join(ruta_out, f"{nombre_base}_teselas.csv"),
+                         index=False)
+
+    if con_h0_global:
+        if aristas_h0:
+            aristas = np.concatenate(aristas_h0)
+            longitudes = np.concatenate(longitudes_h0)
+        else:
+            aristas = np.empty((0, 2), dtype=np.int64)
+            longitudes = np.empty(0)
+        diag0 = h0_global(len(puntos), aristas, longitudes)
+        pd.DataFrame({"dimension": diag0[:, 0].astype(int),
+                      "birth": diag0[:, 1], "death": diag0[:, 2]}).to_csv(
+            os.path.join(ruta_out, f"{nombre_base}_h0_global.csv"), index=False)
+
+    return nombre_csv
+
+
+def calcular_teselas(ruta_centroides: str, radio: float, tam: float,
+                     solape: float, n_workers: int,
+                     con_h0_global: bool = False) -> str:
+    """Procesa en modo teselado todas las láminas de una carpeta."""
+    ruta_teselas = os.path.join(ruta_centroides, "resultados",
+                                f"teselas_{radio}_{tam}")
+    os.makedirs(ruta_teselas, exist_ok=True)
+
+    archivos_csv = sorted(
+        f for f in os.listdir(ruta_centroides)
+        if f.lower().endswith(".csv")
+    )
+    if not archivos_csv:
+        print("  No se encontraron CSV en la ruta indicada.")
+        return ruta_teselas
+
+    inicio = time.time()
+    # Las láminas van en serie: el paralelismo es entre teselas
+    for csv in archivos_csv:
+        procesar_csv_teselas(csv, ruta_centroides, ruta_teselas, radio, tam,
+                             solape, n_workers, con_h0_global)
+
+    print(f"\n Resultados guardados en: {ruta_teselas}")
+    print(f"  Tiempo total: {time.time() - inicio:.2f} s")
+    return ruta_teselas
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test de asociación por kernels topológicos (TopKAT) directamente sobre las
+matrices de Wasserstein, sin pasar por R.
+
+Para cada dimensión se construye un kernel gaussiano a partir de la matriz de
+distancias,
+
+    K_d = exp(−W_d² / ρ_d)        ρ_d = mediana de W_d² fuera de la diagonal
+
+y se combinan como K_ω = ω·K_0 + (1 − ω)·K_1 para ω ∈ {0, 0.5, 1}.  Con una
+respuesta binaria y el modelo nulo con sólo intercepto, el estadístico de
+score es Q_ω = rᵀ K_ω r con r = y − ȳ.  Como Q es lineal en K basta con
+calcular rᵀK_0r y rᵀK_1r una vez por permutación; las permutaciones se
+evalúan en lotes B×n (dos productos de matrices por lote) repartidos entre
+procesos.  El p-valor global combina los de cada ω con el test de Cauchy.
+
+Las semillas de cada lote salen de ``SeedSequence(semilla).spawn``, así que el
+resultado sólo depende de --semilla, --permutaciones y --lote, no de
+--workers.
+
+Ejecución
+---------
+$ python topkat.py /ruta/a/distancias_wasserstein [--variable fanconi]
+                   [--positivo Fanconi] [--tipos carcinoma dysplasia]
+                   [--permutaciones 10000] [--workers 4] [--semilla 0]
+
+Argumentos
+----------
+/ruta/...        : carpeta con wasserstein_dim0/dim1 (CSV o binario); si no
+                   las tiene, se recorren sus subcarpetas (p. ej.
+                   distancias_grupos/<grupo>/) y se testea cada una.
+--variable       : 'fanconi' (get_fanconi_status) o 'tipo' (get_sample_type).
+--positivo       : clase codificada como 1 (default 'Fanconi' / obligatoria
+                   con --variable tipo); el resto vale 0.
+--tipos          : restringe las muestras a estos tipos de muestra.
+--permutaciones  : número de permutaciones (default=10000).
+--lote           : permutaciones por tarea (default=1000).
+
+Resultados en <carpeta>/../topkat_<carpeta>_<variable>.csv, fuera de la
+carpeta de matrices para no mezclarse con ellas.
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lotes import repartir_permutaciones
+from matriz_condensada import cargar_matriz, matrices_carpeta
+from metadatos import clean_filename, get_sample_type, get_fanconi_status
+
+
+OMEGAS = (0.0, 0.5, 1.0)
+
+VARIABLES = {
+    "fanconi": get_fanconi_status,
+    "tipo": get_sample_type,
+}
+
+COLUMNAS_TOPKAT = [
+    "matrices", "variable", "positivo", "n", "n_positivos",
+    "omega", "estadistico", "p_valor",
+]
+
+# Kernels de la carpeta en curso, copiados una vez por worker
+_KERNELS = {}
+
+
+# --------------------------------------------------------------------------- #
+#  MATRICES Y KERNELS
+# --------------------------------------------------------------------------- #
+def par_wasserstein(ruta_dir: str):
+    """Rutas de las matrices de Wasserstein dim 0 y dim 1 de una carpeta."""
+    rutas = {}
+    for ruta in matrices_carpeta(ruta_dir):
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        for dim in (0, 1):
+            if base.endswith(f"wasserstein_dim{dim}"):
+                rutas.setdefault(dim, ruta)
+    if len(rutas) < 2:
+        return None
+    return rutas[0], rutas[1]
+
+
+def kernel_gaussiano(dist: np.ndarray, rho: float = None) -> np.ndarray:
+    """K = exp(−D²/ρ); por defecto ρ = mediana de D² fuera de la diagonal."""
+    if not np.isfinite(dist).all():
+        raise ValueError("La matriz de distancias tiene valores no finitos.")
+    d2 = dist ** 2
+    if rho is None:
+        fuera = d2[np.triu_indices(len(d2), k=1)]
+        rho = float(np.median(fuera)) if len(fuera) else 1.0
+        if rho <= 0:
+            rho = 1.0
+    return np.exp(-d2 / rho)
+
+
+def respuesta(etiquetas, variable: str, positivo: str, tipos=None):
+    """Índices de las muestras usadas y vector binario y."""
+    clasificar = VARIABLES[variable]
+    indices, y = [], []
+    for k, etiqueta in enumerate(etiquetas):
+        nombre = clean_filename(etiqueta)
+        if tipos and get_sample_type(nombre) not in tipos:
+            continue
+        indices.append(k)
+        y.append(1.0 if clasificar(nombre) == positivo else 0.0)
+    return np.array(indices, dtype=int), np.array(y)
+
+
+# --------------------------------------------------------------------------- #
+#  PERMUTACIONES EN LOTES
+# --------------------------------------------------------------------------- #
+def _iniciar_worker(k0, k1, r):
+    _KERNELS.update(k0=k0, k1=k1, r=r)
+
+
+def estadisticos(R: np.ndarray, k0: np.ndarray, k1: np.ndarray):
+    """rᵀK_0r y rᵀK_1r para cada fila de R (B×n)."""
+    q0 = np.einsum("bi,bi->b", R @ k0, R)
+    q1 = np.einsum("bi,bi->b", R @ k1, R)
+    return q0, q1
+
+
+def _lote_permutado(semilla: np.random.SeedSequence, tamano: int):
+    rng = np.random.default_rng(semilla)
+    r = _KERNELS["r"]
+    R = rng.permuted(np.tile(r, (tamano, 1)), axis=1)
+    return estadisticos(R, _KERNELS["k0"], _KERNELS["k1"])
+
+
+def combinar_cauchy(p_valores) -> float:
+    """Combinación de Cauchy (Liu & Xie, 2020) con pesos iguales."""
+    p = np.clip(np.asarray(p_valores, dtype=float), 1e-15, 1 - 1e-15)
+    t = np.mean(np.tan((0.5 - p) * np.pi))
+    return float(0.5 - np.arctan(t) / np.pi)
+
+
+def topkat(k0: np.ndarray, k1: np.ndarray, y: np.ndarray,
+           n_perm: int = 10000, workers: int = 4, semilla: int = 0,
+           lote: int = 1000, omegas=OMEGAS):
+    """
+    Test TopKAT por permutaciones.
+
+    Devuelve ``(Q_obs, p_valores, p_global)`` con un valor por ω.
+    """
+    r = y - y.mean()
+    q0, q1 = estadisticos(r[None, :], k0, k1)
+    omegas = np.asarray(omegas, dtype=float)
+    q_obs = omegas * q0[0] + (1 - omegas) * q1[0]
+
+    tamanos = repartir_permutaciones(n_perm, lote)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    mayores = np.zeros(len(omegas))
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_iniciar_worker,
+                             initargs=(k0, k1, r)) as pool:
+        for p0, p1 in pool.map(_lote_permutado, semillas, tamanos):
+            q_perm = np.outer(p0, omegas) + np.outer(p1, 1 - omegas)
+            # Tolerancia relativa (válida también con Q < 0, el kernel no
+            # es necesariamente PSD): las permutaciones idénticas a y empatan
+            mayores += (q_perm >= q_obs - 1e-12 * np.abs(q_obs)).sum(axis=0)
+
+    p_valores = (1 + mayores) / (1 + n_perm)
+    return q_obs, p_valores, combinar_cauchy(p_valores)
+
+
+# --------------------------------------------------------------------------- #
+#  FUNCIÓN PRINCIPAL
+# --------------------------------------------------------------------------- #
+def _testear_carpeta(ruta0: str, ruta1: str, args) -> list:
+    m0, m1 = cargar_matriz(ruta0), cargar_matriz(ruta1)
+    if m0.etiquetas != m1.etiquetas:
+        raise ValueError(f"Las etiquetas de {os.path.basename(ruta0)} y "
+                         f"{os.path.basename(ruta1)} no coinciden.")
+
+    indices, y = respuesta(m0.etiquetas, args.variable, args.positivo,
+                           args.tipos)
+    n_pos = int(y.sum())
+    if n_pos == 0 or n_pos == len(y):
+        print(f"  Sólo hay una clase ({n_pos}/{len(y)} positivos), se omite.")
+        return []
+
+    sub = np.ix_(indices, indices)
+    d0 = m0.a_dataframe().to_numpy(dtype=float)[sub]
+    d1 = m1.a_dataframe().to_numpy(dtype=float)[sub]
+    # Con distancias inf (p. ej. distinto número de puntos esenciales) K y Q
+    # serían NaN y el p-valor saldría falsamente significativo
+    if not (np.isfinite(d0).all() and np.isfinite(d1).all()):
+        print("  La matriz tiene distancias no finitas, se omite.")
+        return []
+    k0, k1 = kernel_gaussiano(d0), kernel_gaussiano(d1)
+
+    q_obs, p_valores, p_global = topkat(k0, k1, y, args.permutaciones,
+                                        args.workers, args.semilla, args.lote)
+
+    base = {"variable": args.variable, "positivo": args.positivo,
+            "n": len(y), "n_positivos": n_pos}
+    filas = []
+    for omega, q, p in zip(OMEGAS, q_obs, p_valores):
+        print(f"  ω = {omega:.1f}: Q = {q:.4g} · p = {p:.4g}")
+        filas.append({**base, "omega": omega, "estadistico": q, "p_valor": p})
+    print(f"  p-valor global (Cauchy): {p_global:.4g}")
+    filas.append({**base, "omega": "global", "estadistico": np.nan,
+                  "p_valor": p_global})
+    return filas
+
+
+def calcular_topkat(ruta_dir: str, args) -> str:
+    t0 = time.time()
+    ruta_dir = os.path.abspath(ruta_dir)
+
+    carpetas = []
+    for raiz, subdirs, _ in os.walk(ruta_dir):
+        subdirs.sort()
+        rutas = par_wasserstein(raiz)
+        if rutas is not None:
+            carpetas.append((os.path.relpath(raiz, ruta_dir), rutas))
+    if not carpetas:
+        print(f" No hay matrices wasserstein_dim0/dim1 en '{ruta_dir}'.")
+        sys.exit(1)
+
+    filas = []
+    for nombre, (ruta0, ruta1) in carpetas:
+        print(f" TopKAT · {nombre} · {args.variable} = {args.positivo}")
+        for fila in _testear_carpeta(ruta0, ruta1, args):
+            filas.append({"matrices": nombre, **fila})
+
+    ruta_salida = os.path.join(
+        os.path.dirname(ruta_dir),
+        f"topkat_{os.path.basename(ruta_dir)}_{args.variable}.csv")
+    pd.DataFrame(filas, columns=COLUMNAS_TOPKAT).to_csv(ruta_salida,
+                                                        index=False)
+    print(f"\n Resultados guardados en: {ruta_salida}")
+    print(f"  Tiempo total: {time.time() - t0:.2f} s")
+    return ruta_salida
+
+
+# --------------------------------------------------------------------------- #
+#  CLI
+# --------------------------------------------------------------------------- #
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Test TopKAT sobre matrices de Wasserstein.")
+    p.add_argument("ruta", help="Carpeta con las matrices de distancia")
+    p.add_argument("--variable", choices=sorted(VARIABLES), default="fanconi",
+                   help="Variable respuesta (default=fanconi)")
+    p.add_argument("--positivo", default=None,
+                   help="Clase codificada como 1 (default='Fanconi')")
+    p.add_argument("--tipos", nargs="+", default=None,
+                   help="Usar sólo estos tipos de muestra")
+    p.add_argument("--permutaciones", type=int, default=10000,
+                   help="Número de permutaciones (default=10000)")
+    p.add_argument("--lote", type=int, default=1000,
+                   help="Permutaciones por tarea (default=1000)")
+    p.add_argument("--workers", type=int, default=4,
+                   help="Procesos en paralelo (default=4)")
+    p.add_argument("--semilla", type=int, default=0,
+                   help="Semilla de las permutaciones (default=0)")
+    args = p.parse_args()
+
+    if args.positivo is None:
+        if args.variable != "fanconi":
+            p.error("--positivo es obligatorio con --variable tipo")
+        args.positivo = "Fanconi"
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not os.path.isdir(args.ruta):
+        print(f" La ruta '{args.ruta}' no existe o no es un directorio.")
+        sys.exit(1)
+
+    calcular_topkat(args.ruta, args)